@@ -1,7 +1,21 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
+import os
 import random
+import threading
+
+from arcade_db import (
+    DEFAULT_REGIONS, initialize_db, add_region_to_db, get_region_names, add_arcade_to_db, get_arcades,
+    update_arcade_location, delete_arcades_from_db, count_machines_in_arcades, add_machine_to_db,
+    get_machines, update_machine, update_machines, delete_machines_from_db, get_arcade_names,
+    get_player_data, save_scores_to_db, adjust_scores, replace_leaderboard, fetch_arcade_data,
+    calculate_revenue,
+)
+from change_bus import ChangeBus, ChangeWatcher
+from play_analytics import PlayAnalytics
+
+# All simulated values come from this generator; set ARCADE_SEED to make a run repeatable
+rng = random.Random(os.environ.get('ARCADE_SEED'))
 
 # Data Structures
 class GameMachine:
@@ -70,106 +84,27 @@ class GlobalManager:
     def calculate_global_revenue(self):
         return sum(region.calculate_region_revenue() for region in self.regions)
 
-# Database setup
-def initialize_db():
-    conn = sqlite3.connect('arcade_management.db')
-    cursor = conn.cursor()
-    
-    # Create tables if they do not exist
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS regions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS arcades (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            arcade_id TEXT NOT NULL,
-            location TEXT NOT NULL,
-            region_id INTEGER,
-            FOREIGN KEY (region_id) REFERENCES regions (id)
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS machines (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            machine_id TEXT NOT NULL,
-            machine_type TEXT NOT NULL,
-            token_cost REAL NOT NULL,
-            arcade_id TEXT NOT NULL,
-            FOREIGN KEY (arcade_id) REFERENCES arcades (arcade_id)
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS leaderboard (
-            username TEXT PRIMARY KEY,
-            score INTEGER NOT NULL
-        )
-    ''')
-    
-    # Check if the token_cost column exists, and if not, add it
-    cursor.execute("PRAGMA table_info(machines)")
-    columns = [column[1] for column in cursor.fetchall()]
-    if 'token_cost' not in columns:
-        cursor.execute("ALTER TABLE machines ADD COLUMN token_cost REAL NOT NULL DEFAULT 0")
-
-    conn.commit()
-    conn.close()
-
 # Leaderboard setup and definition
 leaderboard = {}  # Making this empty so the variable has definition
 
-# Function to add a region to the database
-def add_region_to_db(region_name):
-    conn = sqlite3.connect('arcade_management.db')
-    cursor = conn.cursor()
-    cursor.execute('INSERT OR IGNORE INTO regions (name) VALUES (?)', (region_name,))
-    conn.commit()
-    conn.close()
-
-# Function to add an arcade to the database
-def add_arcade_to_db(arcade_id, location, region_name):
-    conn = sqlite3.connect('arcade_management.db')
-    cursor = conn.cursor()
-    
-    # Get the region ID
-    cursor.execute('SELECT id FROM regions WHERE name = ?', (region_name,))
-    region_id = cursor.fetchone()
-    
-    if region_id:
-        cursor.execute('INSERT INTO arcades (arcade_id, location, region_id) VALUES (?, ?, ?)', 
-                       (arcade_id, location, region_id[0]))
-        conn.commit()
-        print(f"Arcade '{arcade_id}' added to region '{region_name}' in the database.")  # Debugging
-    else:
-        print(f"Region '{region_name}' not found in the database.")  # Debugging
-    conn.close()
+# Arcade IDs are only unique within a region and machine IDs within an arcade,
+# so edits and deletes are scoped to the region or arcade the list was loaded for
+arcade_list_region = None
+machine_list_arcade = None
 
 # Function to refresh the arcade list based on the selected region
 def refresh_arcade_list(event=None):
+    global arcade_list_region
     for item in arcade_list.get_children():
         arcade_list.delete(item)
     
     selected_region = region_dropdown.get()  # Get the selected region from the dropdown
-    conn = sqlite3.connect('arcade_management.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT arcade_id, location FROM arcades 
-        WHERE region_id = (SELECT id FROM regions WHERE name = ?)
-    ''', (selected_region,))
-    
-    rows = cursor.fetchall()
-    for row in rows:
-        arcade_list.insert('', 'end', values=row)
-    
-    conn.close()
+    arcade_list_region = selected_region
+    for arcade_id, location, _ in get_arcades(selected_region):
+        arcade_list.insert('', 'end', values=(arcade_id, location))
 
 # Function to open the edit arcade dialog
-def open_edit_arcade_dialog(arcade_id, current_location):
+def open_edit_arcade_dialog(arcade_id, current_location, region):
     edit_window = tk.Toplevel(root)
     edit_window.title("Edit Arcade")
     
@@ -185,17 +120,9 @@ def open_edit_arcade_dialog(arcade_id, current_location):
     def save_changes():
         new_location = new_location_entry.get()
         if new_location:
-            conn = sqlite3.connect('arcade_management.db')
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE arcades 
-                SET location = ? 
-                WHERE arcade_id = ?
-            ''', (new_location, arcade_id))
-            conn.commit()
-            conn.close()
+            update_arcade_location(arcade_id, new_location, region)
             messagebox.showinfo("Success", f"Arcade '{arcade_id}' updated.")
-            refresh_arcade_list()  # Refresh the arcade list
+            watcher.poll()  # Let every tab showing arcades refresh
             edit_window.destroy()
         else:
             messagebox.showwarning("Input Error", "Please enter a new location.")
@@ -206,36 +133,37 @@ def open_edit_arcade_dialog(arcade_id, current_location):
 # Function to edit the selected arcade
 def edit_arcade():
     selected_item = arcade_list.selection()
-    if selected_item:
+    if len(selected_item) > 1:
+        messagebox.showwarning("Selection Error", "Please select a single arcade to edit.")
+    elif selected_item:
         arcade_id = arcade_list.item(selected_item)['values'][0]  # Get the arcade ID from the selected item
         current_location = arcade_list.item(selected_item)['values'][1]  # Get the current location
-        open_edit_arcade_dialog(arcade_id, current_location)
+        open_edit_arcade_dialog(arcade_id, current_location, arcade_list_region)
     else:
         messagebox.showwarning("Selection Error", "Please select an arcade to edit.")
 
-# Function to delete the selected arcade
+# Function to delete the selected arcades along with their machines
 def delete_arcade():
-    selected_item = arcade_list.selection()
-    if selected_item:
-        arcade_id = arcade_list.item(selected_item)['values'][0]  # Get the arcade ID from the selected item
-        conn = sqlite3.connect('arcade_management.db')
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM arcades WHERE arcade_id = ?', (arcade_id,))
-        conn.commit()
-        conn.close()
-        messagebox.showinfo("Success", f"Arcade '{arcade_id}' deleted.")
-        refresh_arcade_list()  # Refresh the arcade list
+    selected_items = arcade_list.selection()
+    if selected_items:
+        arcade_ids = [arcade_list.item(item)['values'][0] for item in selected_items]  # Get the arcade IDs from the selected items
+        region = arcade_list_region
+        num_machines = count_machines_in_arcades(region, arcade_ids)
+        if num_machines or len(arcade_ids) > 1:
+            if not messagebox.askyesno("Confirm Delete", f"Delete {len(arcade_ids)} arcade(s) in {region} and their {num_machines} machine(s)?"):
+                return
+        arcades_deleted, machines_deleted = delete_arcades_from_db(region, arcade_ids)  # One transaction for the whole batch
+        if len(arcade_ids) == 1:
+            messagebox.showinfo("Success", f"Arcade '{arcade_ids[0]}' and {machines_deleted} machine(s) deleted.")
+        else:
+            messagebox.showinfo("Success", f"{arcades_deleted} arcades and {machines_deleted} machine(s) deleted.")
+        watcher.poll()  # Let every tab showing arcades refresh
     else:
         messagebox.showwarning("Selection Error", "Please select an arcade to delete.")
 
 # Function to populate the region dropdown
 def populate_region_dropdown():
-    conn = sqlite3.connect('arcade_management.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT name FROM regions')
-    regions = [row[0] for row in cursor.fetchall()]
-    region_dropdown['values'] = regions
-    conn.close()
+    region_dropdown['values'] = get_region_names()
 
 # Function to add an arcade
 def add_arcade():
@@ -244,43 +172,25 @@ def add_arcade():
     selected_region = region_dropdown.get()
     
     if arcade_id and location and selected_region:
-        add_arcade_to_db(arcade_id, location, selected_region)
-        refresh_arcade_list()  # Refresh the arcade list after adding
+        if not add_arcade_to_db(arcade_id, location, selected_region):
+            messagebox.showwarning("Input Error", f"Region '{selected_region}' not found.")
+            return
+        watcher.poll()  # Let every tab showing arcades refresh
         arcade_id_entry.delete(0, tk.END)  # Clear the entry
         location_entry.delete(0, tk.END)  # Clear the entry
     else:
         messagebox.showwarning("Input Error", "Please fill in all fields.")
 
-# Function to add a machine to the database
-def add_machine_to_db(machine_name, game_title, token_cost, arcade_id):
-    conn = sqlite3.connect('arcade_management.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO machines (machine_id, machine_type, token_cost, arcade_id) 
-        VALUES (?, ?, ?, ?)
-    ''', (machine_name, game_title, token_cost, arcade_id))
-    conn.commit()
-    conn.close()
-    print(f"Machine '{machine_name}' added to arcade '{arcade_id}' in the database.")  # Debugging
-
 # Function to refresh the machine list based on the selected arcade
 def refresh_machine_list(event=None):
+    global machine_list_arcade
     for item in machine_list.get_children():
         machine_list.delete(item)
 
     selected_arcade = arcade_selection_dropdown.get()  # Get the selected arcade from the dropdown
-    conn = sqlite3.connect('arcade_management.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT machine_id, machine_type, token_cost FROM machines 
-        WHERE arcade_id = ?
-    ''', (selected_arcade,))
-    
-    rows = cursor.fetchall()
-    for row in rows:
-        machine_list.insert('', 'end', values=row)
-    
-    conn.close()
+    machine_list_arcade = selected_arcade
+    for machine_id, machine_type, token_cost, _ in get_machines(selected_arcade):
+        machine_list.insert('', 'end', values=(machine_id, machine_type, token_cost))
 
 # Function to add a machine
 def add_machine():
@@ -292,7 +202,7 @@ def add_machine():
     if selected_arcade:
         if machine_name and game_title and token_cost:
             add_machine_to_db(machine_name, game_title, token_cost, selected_arcade)
-            refresh_machine_list()  # Refresh the machine list after adding
+            watcher.poll()  # Let every tab showing machines refresh
             machine_name_entry.delete(0, tk.END)  # Clear the entry
             game_title_entry.delete(0, tk.END)  # Clear the entry
             token_cost_entry.delete(0, tk.END)  # Clear the entry
@@ -302,7 +212,7 @@ def add_machine():
         messagebox.showwarning("Selection Error", "Please select an arcade to add a machine.")
 
 # Function to open the edit machine dialog
-def open_edit_machine_dialog(machine_id, current_type, current_cost):
+def open_edit_machine_dialog(machine_id, current_type, current_cost, arcade_id):
     edit_window = tk.Toplevel(root)
     edit_window.title("Edit Machine")
     
@@ -324,17 +234,9 @@ def open_edit_machine_dialog(machine_id, current_type, current_cost):
         new_type = new_type_entry.get()
         new_cost = new_cost_entry.get()
         if new_type and new_cost:
-            conn = sqlite3.connect('arcade_management.db')
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE machines 
-                SET machine_type = ?, token_cost = ? 
-                WHERE machine_id = ?
-            ''', (new_type, new_cost, machine_id))
-            conn.commit()
-            conn.close()
+            update_machine(machine_id, new_type, new_cost, arcade_id)
             messagebox.showinfo("Success", f"Machine '{machine_id}' updated.")
-            refresh_machine_list()  # Refresh the machine list
+            watcher.poll()  # Let every tab showing machines refresh
             edit_window.destroy()
         else:
             messagebox.showwarning("Input Error", "Please enter both type and cost.")
@@ -342,40 +244,77 @@ def open_edit_machine_dialog(machine_id, current_type, current_cost):
     save_button = ttk.Button(edit_window, text="Save", command=save_changes)
     save_button.grid(row=3, column=0, columnspan=2, pady=10)
 
-# Function to edit the selected machine
+# Function to open the batch edit dialog for several machines
+def open_batch_edit_machine_dialog(machine_ids, arcade_id):
+    edit_window = tk.Toplevel(root)
+    edit_window.title("Edit Machines")
+
+    ttk.Label(edit_window, text="Machines:").grid(row=0, column=0, padx=10, pady=10)
+    ttk.Label(edit_window, text=f"{len(machine_ids)} selected in arcade '{arcade_id}'").grid(row=0, column=1, padx=10, pady=10)
+
+    ttk.Label(edit_window, text="New Type:").grid(row=1, column=0, padx=10, pady=10)
+    new_type_entry = ttk.Entry(edit_window)
+    new_type_entry.grid(row=1, column=1, padx=10, pady=10)
+
+    ttk.Label(edit_window, text="New Token Cost:").grid(row=2, column=0, padx=10, pady=10)
+    new_cost_entry = ttk.Entry(edit_window)
+    new_cost_entry.grid(row=2, column=1, padx=10, pady=10)
+
+    ttk.Label(edit_window, text="Leave a field blank to keep current values.").grid(row=3, column=0, columnspan=2, padx=10)
+
+    def save_changes():
+        new_type = new_type_entry.get() or None
+        new_cost = new_cost_entry.get() or None
+        if new_type is None and new_cost is None:
+            messagebox.showwarning("Input Error", "Please enter a type or a cost.")
+            return
+        if new_cost is not None:
+            try:
+                new_cost = float(new_cost)
+            except ValueError:
+                messagebox.showwarning("Input Error", "Token cost must be a number.")
+                return
+        updated = update_machines(arcade_id, machine_ids, new_type, new_cost)  # One transaction for the whole batch
+        messagebox.showinfo("Success", f"{updated} machines updated.")
+        watcher.poll()  # Let every tab showing machines refresh
+        edit_window.destroy()
+
+    save_button = ttk.Button(edit_window, text="Save", command=save_changes)
+    save_button.grid(row=4, column=0, columnspan=2, pady=10)
+
+# Function to edit the selected machine, or all selected machines at once
 def edit_machine():
     selected_item = machine_list.selection()
-    if selected_item:
+    if len(selected_item) > 1:
+        open_batch_edit_machine_dialog([machine_list.item(item)['values'][0] for item in selected_item], machine_list_arcade)
+    elif selected_item:
         machine_id = machine_list.item(selected_item)['values'][0]  # Get the machine ID from the selected item
         current_type = machine_list.item(selected_item)['values'][1]  # Get the current type
         current_cost = machine_list.item(selected_item)['values'][2]  # Get the current cost
-        open_edit_machine_dialog(machine_id, current_type, current_cost)
+        open_edit_machine_dialog(machine_id, current_type, current_cost, machine_list_arcade)
     else:
         messagebox.showwarning("Selection Error", "Please select a machine to edit.")
 
-# Function to delete the selected machine
+# Function to delete the selected machines
 def delete_machine():
-    selected_item = machine_list.selection()
-    if selected_item:
-        machine_id = machine_list.item(selected_item)['values'][0]  # Get the machine ID from the selected item
-        conn = sqlite3.connect('arcade_management.db')
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM machines WHERE machine_id = ?', (machine_id,))
-        conn.commit()
-        conn.close()
-        messagebox.showinfo("Success", f"Machine '{machine_id}' deleted.")
-        refresh_machine_list()  # Refresh the machine list
+    selected_items = machine_list.selection()
+    if selected_items:
+        machine_ids = [machine_list.item(item)['values'][0] for item in selected_items]  # Get the machine IDs from the selected items
+        arcade_id = machine_list_arcade
+        if len(machine_ids) > 1 and not messagebox.askyesno("Confirm Delete", f"Delete {len(machine_ids)} machines from arcade '{arcade_id}'?"):
+            return
+        deleted = delete_machines_from_db(arcade_id, machine_ids)  # One transaction for the whole batch
+        if len(machine_ids) == 1:
+            messagebox.showinfo("Success", f"Machine '{machine_ids[0]}' deleted.")
+        else:
+            messagebox.showinfo("Success", f"{deleted} machines deleted.")
+        watcher.poll()  # Let every tab showing machines refresh
     else:
         messagebox.showwarning("Selection Error", "Please select a machine to delete.")
 
-# Function to populate the arcade selection dropdown
-def populate_arcade_selection():
-    conn = sqlite3.connect('arcade_management.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT arcade_id FROM arcades')
-    arcades = [row[0] for row in cursor.fetchall()]
-    arcade_selection_dropdown['values'] = arcades
-    conn.close()
+# Function to select every machine in the list
+def select_all_machines():
+    machine_list.selection_set(machine_list.get_children())
 
 # Function to display arcade data and revenue in Global Management
 def display_global_management_data(region):
@@ -383,7 +322,7 @@ def display_global_management_data(region):
         global_arcade_list.delete(item)
 
     arcade_data = fetch_arcade_data(region)
-    revenue_data = calculate_revenue(arcade_data)
+    revenue_data = calculate_revenue(arcade_data, rng)
 
     for arcade in revenue_data:
         arcade_name, num_machines, avg_token_cost, total_revenue = arcade
@@ -394,28 +333,6 @@ def display_global_management_data(region):
 
         global_arcade_list.insert('', 'end', values=(arcade_name, num_machines, f"{avg_token_cost:.2f}", f"${total_revenue:.2f}"))
 
-def fetch_arcade_data(region):
-    conn = sqlite3.connect('arcade_management.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT arcades.arcade_id, COUNT(machines.machine_id), AVG(machines.token_cost) 
-        FROM arcades 
-        LEFT JOIN machines ON arcades.arcade_id = machines.arcade_id 
-        WHERE arcades.region_id = (SELECT id FROM regions WHERE name = ?) 
-        GROUP BY arcades.arcade_id
-    ''', (region,))
-    arcade_data = cursor.fetchall()
-    conn.close()
-    return arcade_data
-
-def calculate_revenue(arcade_data):
-    revenue_data = []
-    for arcade in arcade_data:
-        arcade_name, num_machines, avg_token_cost = arcade
-        total_revenue = sum(random.uniform(50.00, 1200.00) for _ in range(num_machines))
-        revenue_data.append((arcade_name, num_machines, avg_token_cost, total_revenue))
-    return revenue_data
-
 # Leaderboard Setup
 usernames = [
     "ByteMe", "CodeCracker", "DebugDiva", "PixelPioneer", "ScriptSage",
@@ -441,11 +358,7 @@ usernames = [
 
 # Load scores from the database
 def load_scores():
-    conn = sqlite3.connect('arcade_management.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT username, score FROM leaderboard')
-    scores = cursor.fetchall()
-    conn.close()
+    scores = get_player_data()
     
     # Initialize the leaderboard with scores from the database
     global leaderboard  # Ensure you are modifying the global leaderboard variable
@@ -453,40 +366,26 @@ def load_scores():
 
 # Initialize scores for the top 50 usernames if the leaderboard is empty
 def initialize_leaderboard():
-    conn = sqlite3.connect('arcade_management.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT COUNT(*) FROM leaderboard')
-    count = cursor.fetchone()[0]
-    
     global leaderboard  # Ensure you are modifying the global leaderboard variable
-    if count == 0:  # If the leaderboard is empty, randomize scores
-        leaderboard = {username: random.randint(1, 50000) for username in random.sample(usernames, 50)}
+    if not get_player_data(limit=1):  # If the leaderboard is empty, randomize scores
+        leaderboard = {username: rng.randint(1, 50000) for username in rng.sample(usernames, 50)}
         save_scores()  # Save the randomized scores to the database
     else:
         load_scores()  # Load existing scores from the database
 
-    conn.close()  # Ensure the connection is closed
-
 # Save scores for the leaderboard
 def save_scores():
-    conn = sqlite3.connect('arcade_management.db')
-    cursor = conn.cursor()    
-
-    for username, score in leaderboard.items():
-        cursor.execute('INSERT OR REPLACE INTO leaderboard (username, score) VALUES (?, ?)', (username, score))    
+    save_scores_to_db(leaderboard)
 
-    conn.commit()
-    conn.close()
-
-# Initialize the leaderboard
-initialize_leaderboard()
+# Initialize the database before anything reads from it
+initialize_db()
 
 # Function to update scores randomly
 def update_scores():
-    username = random.choice(list(leaderboard.keys()))
-    change = random.randint(-1000, 1000)  # Randomly add or remove points
-    leaderboard[username] = max(0, leaderboard[username] + change)  # Ensure score doesn't go below 0
-    display_leaderboard()
+    if leaderboard:  # Empty while another instance resets the board
+        username = rng.choice(list(leaderboard.keys()))
+        change = rng.randint(-1000, 1000)  # Randomly add or remove points
+        adjust_scores([(username, change)])  # The change watcher reloads and redraws the leaderboard
     root.after(30000, update_scores)  # Schedule next update in 30 seconds
 
 # Function to display the leaderboard
@@ -500,25 +399,25 @@ def display_leaderboard():
 
 # Function to refresh scores for a random number of users
 def refresh_scores():
-    save_scores()  # Save current scores to the database
-    
-    num_updates = random.randint(3, 8)  # Choose a random number of scores to update
+    if not leaderboard:
+        return
+    num_updates = rng.randint(3, 8)  # Choose a random number of scores to update
+    changes = []
     for _ in range(num_updates):
-        username = random.choice(list(leaderboard.keys()))
-        change = random.randint(-5000, 5000)  # Randomly add or subtract points
-        leaderboard[username] = max(0, leaderboard[username] + change)  # Ensure score doesn't go below 0
-    display_leaderboard()
+        username = rng.choice(list(leaderboard.keys()))
+        change = rng.randint(-5000, 5000)  # Randomly add or subtract points
+        changes.append((username, change))
+    adjust_scores(changes)  # Only the changed rows are written
+    watcher.poll()
+
 
 # Create the main window
 root = tk.Tk()
 root.title("International Gaming Arcade Management System")
 root.geometry("800x600")
 
-# Initialize the database
-initialize_db()
-
 # Add regions to the database
-regions = ["North America", "Europe East", "Europe West", "Asia", "Other"]
+regions = DEFAULT_REGIONS
 for region in regions:
     add_region_to_db(region)
 
@@ -554,204 +453,241 @@ operations_notebook.add(global_frame, text="Global Management")
 operations_notebook.add(regional_frame, text="Regional Management")
 operations_notebook.add(local_frame, text="Local Management")
 
+# Change notifications: each tab subscribes to the tables behind it once it has been built
+bus = ChangeBus()
+watcher = ChangeWatcher(bus)
+
 # Global Management
-ttk.Label(global_frame, text="Global Management").pack(pady=10)
-ttk.Label(global_frame, text="Select Region:").pack(pady=5)
-region_dropdown_global = ttk.Combobox(global_frame, values=regions, state='readonly')
-region_dropdown_global.pack(pady=5)
-region_dropdown_global.bind("<<ComboboxSelected>>", lambda event: display_global_management_data(region_dropdown_global.get()))
-
-# Global Arcade List
-global_arcade_list = ttk.Treeview(global_frame, columns=('Arcade Name', 'Number of Machines', 'Avg Token Cost', 'Total Revenue'), show='headings')
-global_arcade_list.heading('Arcade Name', text='Arcade Name')
-global_arcade_list.heading('Number of Machines', text='Number of Machines')
-global_arcade_list.heading('Avg Token Cost', text='Avg Token Cost')
-global_arcade_list.heading('Total Revenue', text='Total Revenue')
-global_arcade_list.pack(expand=True, fill='both')
+def build_global_tab():
+    global region_dropdown_global, global_arcade_list
+
+    ttk.Label(global_frame, text="Global Management").pack(pady=10)
+    ttk.Label(global_frame, text="Select Region:").pack(pady=5)
+    region_dropdown_global = ttk.Combobox(global_frame, values=regions, state='readonly')
+    region_dropdown_global.pack(pady=5)
+    region_dropdown_global.bind("<<ComboboxSelected>>", lambda event: display_global_management_data(region_dropdown_global.get()))
+
+    # Global Arcade List
+    global_arcade_list = ttk.Treeview(global_frame, columns=('Arcade Name', 'Number of Machines', 'Avg Token Cost', 'Total Revenue'), show='headings')
+    global_arcade_list.heading('Arcade Name', text='Arcade Name')
+    global_arcade_list.heading('Number of Machines', text='Number of Machines')
+    global_arcade_list.heading('Avg Token Cost', text='Avg Token Cost')
+    global_arcade_list.heading('Total Revenue', text='Total Revenue')
+    global_arcade_list.pack(expand=True, fill='both')
+
+    bus.subscribe(['regions', 'arcades', 'machines'], lambda tables: refresh_global_management())
+
+# Function to redraw Global Management if a region is showing
+def refresh_global_management():
+    if region_dropdown_global.get():
+        display_global_management_data(region_dropdown_global.get())
 
 # Regional Management
-ttk.Label(regional_frame, text="Regional Management").pack(pady=10)
-ttk.Label(regional_frame, text="Select Region:").pack(pady=5)
-region_dropdown = ttk.Combobox(regional_frame, values=regions, state='readonly')
-region_dropdown.pack(pady=5)
+def build_regional_tab():
+    global region_dropdown, arcade_id_entry, location_entry, arcade_list
 
-ttk.Label(regional_frame, text="Arcade ID:").pack(pady=5)
-arcade_id_entry = ttk.Entry(regional_frame)
-arcade_id_entry.pack(pady=5)
-ttk.Label(regional_frame, text="Location:").pack(pady=5)
-location_entry = ttk.Entry(regional_frame)
-location_entry.pack(pady=5)
+    ttk.Label(regional_frame, text="Regional Management").pack(pady=10)
+    ttk.Label(regional_frame, text="Select Region:").pack(pady=5)
+    region_dropdown = ttk.Combobox(regional_frame, values=regions, state='readonly')
+    region_dropdown.pack(pady=5)
 
-# Buttons for Add, Edit, and Delete Arcade
-button_frame = ttk.Frame(regional_frame)
-button_frame.pack(pady=5)
+    ttk.Label(regional_frame, text="Arcade ID:").pack(pady=5)
+    arcade_id_entry = ttk.Entry(regional_frame)
+    arcade_id_entry.pack(pady=5)
+    ttk.Label(regional_frame, text="Location:").pack(pady=5)
+    location_entry = ttk.Entry(regional_frame)
+    location_entry.pack(pady=5)
 
-add_arcade_button = ttk.Button(button_frame, text="Add Arcade", command=add_arcade)
-add_arcade_button.grid(row=0, column=0, padx=5)
+    # Buttons for Add, Edit, and Delete Arcade
+    button_frame = ttk.Frame(regional_frame)
+    button_frame.pack(pady=5)
 
-edit_arcade_button = ttk.Button(button_frame, text="Edit Arcade", command=edit_arcade)
-edit_arcade_button.grid(row=0, column=1, padx=5)
+    add_arcade_button = ttk.Button(button_frame, text="Add Arcade", command=add_arcade)
+    add_arcade_button.grid(row=0, column=0, padx=5)
 
-delete_arcade_button = ttk.Button(button_frame, text="Delete Arcade", command=delete_arcade)
-delete_arcade_button.grid(row=0, column=2, padx=5)
+    edit_arcade_button = ttk.Button(button_frame, text="Edit Arcade", command=edit_arcade)
+    edit_arcade_button.grid(row=0, column=1, padx=5)
 
-# Arcade List for Regional Management
-arcade_list = ttk.Treeview(regional_frame, columns=('Arcade ID', 'Location'), show='headings')
-arcade_list.heading('Arcade ID', text='Arcade ID')
-arcade_list.heading('Location', text='Location')
-arcade_list.pack(expand=True, fill='both')
+    delete_arcade_button = ttk.Button(button_frame, text="Delete Arcade", command=delete_arcade)
+    delete_arcade_button.grid(row=0, column=2, padx=5)
 
-# Local Management UI
-ttk.Label(local_frame, text="Local Management").grid(row=0, column=0, columnspan=3, pady=10)
+    # Arcade List for Regional Management
+    arcade_list = ttk.Treeview(regional_frame, columns=('Arcade ID', 'Location'), show='headings', selectmode='extended')
+    arcade_list.heading('Arcade ID', text='Arcade ID')
+    arcade_list.heading('Location', text='Location')
+    arcade_list.pack(expand=True, fill='both')
 
-ttk.Label(local_frame, text="Select Arcade:").grid(row=1, column=0, padx=5, pady=5)
-arcade_selection_dropdown = ttk.Combobox(local_frame, state='readonly')
-arcade_selection_dropdown.grid(row=1, column=1, padx=5, pady=5)
+    # Bind the region dropdown selection to refresh the arcade list
+    region_dropdown.bind("<<ComboboxSelected>>", refresh_arcade_list)
 
-# Create entries for machine details
-ttk.Label(local_frame, text="Machine Name:").grid(row=2, column=0, padx=5, pady=5)
-machine_name_entry = ttk.Entry(local_frame)
-machine_name_entry.grid(row=2, column=1, padx=5, pady=5)
+    refresh_arcade_list()
+    bus.subscribe(['regions'], lambda tables: populate_region_dropdown())
+    bus.subscribe(['regions', 'arcades'], lambda tables: refresh_arcade_list())
 
-ttk.Label(local_frame, text="Game Title:").grid(row=3, column=0, padx=5, pady=5)
-game_title_entry = ttk.Entry(local_frame)
-game_title_entry.grid(row=3, column=1, padx=5, pady=5)
+# Local Management UI
+def build_local_tab():
+    global arcade_selection_dropdown, machine_name_entry, game_title_entry, token_cost_entry, machine_list
 
-ttk.Label(local_frame, text="Token Cost:").grid(row=4, column=0, padx=5, pady=5)
-token_cost_entry = ttk.Entry(local_frame)
-token_cost_entry.grid(row=4, column=1, padx=5, pady=5)
+    ttk.Label(local_frame, text="Local Management").grid(row=0, column=0, columnspan=3, pady=10)
 
-# Button frame for machine operations
-button_frame = ttk.Frame(local_frame)
-button_frame.grid(row=5, column=0, columnspan=2, pady=10)
+    ttk.Label(local_frame, text="Select Arcade:").grid(row=1, column=0, padx=5, pady=5)
+    arcade_selection_dropdown = ttk.Combobox(local_frame, state='readonly')
+    arcade_selection_dropdown.grid(row=1, column=1, padx=5, pady=5)
 
-# Button to add machine
-add_machine_button = ttk.Button(button_frame, text="Add Machine", command=add_machine)
-add_machine_button.grid(row=0, column=0, padx=5)
+    # Create entries for machine details
+    ttk.Label(local_frame, text="Machine Name:").grid(row=2, column=0, padx=5, pady=5)
+    machine_name_entry = ttk.Entry(local_frame)
+    machine_name_entry.grid(row=2, column=1, padx=5, pady=5)
 
-# Button to edit machine
-edit_machine_button = ttk.Button(button_frame, text="Edit Machine", command=edit_machine)
-edit_machine_button.grid(row=0, column=1, padx=5)
+    ttk.Label(local_frame, text="Game Title:").grid(row=3, column=0, padx=5, pady=5)
+    game_title_entry = ttk.Entry(local_frame)
+    game_title_entry.grid(row=3, column=1, padx=5, pady=5)
 
-# Button to delete machine
-delete_machine_button = ttk.Button(button_frame, text="Delete Machine", command=delete_machine)
-delete_machine_button.grid(row=0, column=2, padx=5)
+    ttk.Label(local_frame, text="Token Cost:").grid(row=4, column=0, padx=5, pady=5)
+    token_cost_entry = ttk.Entry(local_frame)
+    token_cost_entry.grid(row=4, column=1, padx=5, pady=5)
 
-# Machine List for Local Management
-machine_list = ttk.Treeview(local_frame, columns=('Machine Name', 'Game Title', 'Token Cost'), show='headings')
-machine_list.heading('Machine Name', text='Machine Name')
-machine_list.heading('Game Title', text='Game Title')
-machine_list.heading('Token Cost', text='Token Cost')
-machine_list.grid(row=6, column=0, columnspan=2, sticky='nsew')
+    # Button frame for machine operations
+    button_frame = ttk.Frame(local_frame)
+    button_frame.grid(row=5, column=0, columnspan=2, pady=10)
 
-# Populate the arcade selection dropdown
-def populate_arcade_selection():
-    conn = sqlite3.connect('arcade_management.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT arcade_id FROM arcades')
-    arcades = [row[0] for row in cursor.fetchall()]
-    arcade_selection_dropdown['values'] = arcades
-    conn.close()
+    # Button to add machine
+    add_machine_button = ttk.Button(button_frame, text="Add Machine", command=add_machine)
+    add_machine_button.grid(row=0, column=0, padx=5)
 
-# Call the function to populate the arcade selection dropdown
-populate_arcade_selection()
+    # Button to edit machine
+    edit_machine_button = ttk.Button(button_frame, text="Edit Machine", command=edit_machine)
+    edit_machine_button.grid(row=0, column=1, padx=5)
 
-# Refresh the arcade list on startup
-refresh_arcade_list()
+    # Button to delete machine
+    delete_machine_button = ttk.Button(button_frame, text="Delete Machine", command=delete_machine)
+    delete_machine_button.grid(row=0, column=2, padx=5)
 
-# Bind the region dropdown selection to refresh the arcade list
-region_dropdown.bind("<<ComboboxSelected>>", refresh_arcade_list)
+    # Button to select every machine for a batch edit or delete
+    select_all_button = ttk.Button(button_frame, text="Select All", command=select_all_machines)
+    select_all_button.grid(row=0, column=3, padx=5)
 
-# Bind the arcade selection dropdown to refresh the machine list
-arcade_selection_dropdown.bind("<<ComboboxSelected>>", refresh_machine_list)
+    # Machine List for Local Management
+    machine_list = ttk.Treeview(local_frame, columns=('Machine Name', 'Game Title', 'Token Cost'), show='headings', selectmode='extended')
+    machine_list.heading('Machine Name', text='Machine Name')
+    machine_list.heading('Game Title', text='Game Title')
+    machine_list.heading('Token Cost', text='Token Cost')
+    machine_list.grid(row=6, column=0, columnspan=2, sticky='nsew')
 
-# Leaderboard List
-leaderboard_list = ttk.Treeview(leaderboard_frame, columns=('Username', 'Score'), show='headings')
-leaderboard_list.heading('Username', text='Username')
-leaderboard_list.heading('Score', text='Score')
-leaderboard_list.pack(expand=True, fill='both')
+    # Bind the arcade selection dropdown to refresh the machine list
+    arcade_selection_dropdown.bind("<<ComboboxSelected>>", refresh_machine_list)
 
-# Refresh Button for Leaderboard
-refresh_button = ttk.Button(leaderboard_frame, text="Refresh Scores", command=refresh_scores)
-refresh_button.pack(pady=10)
+    # Call the function to populate the arcade selection dropdown
+    populate_arcade_selection()
+    bus.subscribe(['arcades'], lambda tables: populate_arcade_selection())
+    bus.subscribe(['machines'], lambda tables: refresh_machine_list())
+
+# Populate the arcade selection dropdown
+def populate_arcade_selection():
+    arcade_selection_dropdown['values'] = get_arcade_names()
 
 # Function to reset the leaderboard
 def reset_leaderboard():
-    # Clear existing scores from the database
-    conn = sqlite3.connect('arcade_management.db')
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM leaderboard')  # Delete all entries in the leaderboard
-    conn.commit()
-    conn.close()
-
     # Reinitialize the leaderboard with random scores
     global leaderboard
-    leaderboard = {username: random.randint(1, 50000) for username in random.sample(usernames, 50)}
-    save_scores()  # Save the new randomized scores to the database
-    display_leaderboard()  # Update the display to show the new scores    
-
-# Reset Button for Leaderboard
-reset_button = ttk.Button(leaderboard_frame, text="Reset Leaderboard", command=reset_leaderboard)
-reset_button.pack(pady=10)
-
-# Function to get arcade machines from the database
-def get_arcade_machines():
-    conn = sqlite3.connect('arcade_management.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT machine_id FROM machines')  # Adjust the query as needed
-    arcade_machines = [row[0] for row in cursor.fetchall()]  # Fetch all machine IDs
-    conn.close()
-    return arcade_machines
-
-#Function to gather arcade names
-def get_arcade_names():
-    conn = sqlite3.connect('arcade_management.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT arcade_id FROM arcades')  # Adjust the query as needed
-    arcade_names = [row[0] for row in cursor.fetchall()]  # Fetch all arcade IDs
-    conn.close()
-    return arcade_names
-
-#Function to gather player scores
-def get_player_data():
-    conn = sqlite3.connect('arcade_management.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT username, score FROM leaderboard')  # Adjust the query as needed
-    player_data = cursor.fetchall()  # Fetch all player data
-    conn.close()
-    return player_data
+    leaderboard = {username: rng.randint(1, 50000) for username in rng.sample(usernames, 50)}
+    replace_leaderboard(leaderboard)  # Clear and save in one transaction
+    watcher.poll()  # Update the display to show the new scores
+
+# Load the leaderboard and start the score updates the first time a tab needs scores
+leaderboard_loaded = False
+
+def ensure_leaderboard():
+    global leaderboard_loaded
+    if not leaderboard_loaded:
+        leaderboard_loaded = True
+        initialize_leaderboard()
+        # Keep the scores the tick picks from current, whichever tab opened first
+        bus.subscribe(['leaderboard'], lambda tables: load_scores())
+        update_scores()
+
+def build_leaderboard_tab():
+    global leaderboard_list
+
+    # Leaderboard List
+    leaderboard_list = ttk.Treeview(leaderboard_frame, columns=('Username', 'Score'), show='headings')
+    leaderboard_list.heading('Username', text='Username')
+    leaderboard_list.heading('Score', text='Score')
+    leaderboard_list.pack(expand=True, fill='both')
+
+    # Refresh Button for Leaderboard
+    refresh_button = ttk.Button(leaderboard_frame, text="Refresh Scores", command=refresh_scores)
+    refresh_button.pack(pady=10)
+
+    # Reset Button for Leaderboard
+    reset_button = ttk.Button(leaderboard_frame, text="Reset Leaderboard", command=reset_leaderboard)
+    reset_button.pack(pady=10)
+
+    ensure_leaderboard()
+    display_leaderboard()
+    # Subscribed after ensure_leaderboard, so the scores are reloaded before this redraws them
+    bus.subscribe(['leaderboard'], lambda tables: display_leaderboard())
 
 # Function to generate player data
 def generate_player_data():
     players = []
-    arcade_machines = get_arcade_machines()  # Get the list of machine IDs
     arcade_names = get_arcade_names()  # Get the list of arcade names
-    
+
     # Fetch player data from the database
     player_scores = get_player_data()  # Get player data from the database
-    
+
     for username, score in player_scores:
-        arcade = random.choice(arcade_names)  # Use dynamic arcade names
-        revenue = round(score / random.uniform(1.0, 2.0) * .25, 2)  # Calculate revenue
-        most_played_game = random.choice(arcade_machines)  # Randomly select a game
+        arcade = rng.choice(arcade_names) if arcade_names else 'N/A'  # Use dynamic arcade names
+        revenue = round(score / rng.uniform(1.0, 2.0) * .25, 2)  # Calculate revenue
+        most_played_game = play_analytics.most_played_game(username) or 'N/A'  # Game this player has played most
         event_placement = min(max(1, 64 - (score // 781.25)), 64)  # Calculate event placement based on score
         players.append(Player(username, score, arcade, revenue, most_played_game, event_placement))
     return players
 
-# Generate player data
-player_data = generate_player_data()
-
-
-# Player Tracking List
-player_tracking_list = ttk.Treeview(players_frame, columns=('Player', 'Score', 'Revenue', 'Arcade', 'Most Played Game', 'Event Placement', 'Tournament Winner'), show='headings')
-player_tracking_list.heading('Player', text='Player')
-player_tracking_list.heading('Score', text='Score')
-player_tracking_list.heading('Revenue', text='Revenue')
-player_tracking_list.heading('Arcade', text='Arcade')
-player_tracking_list.heading('Most Played Game', text='Most Played Game')
-player_tracking_list.heading('Event Placement', text='Event Placement')
-player_tracking_list.heading('Tournament Winner', text='Tournament Winner')
-player_tracking_list.pack(expand=True, fill='both')
+# Play counts streamed from the plays table; tabs sync it before drawing
+play_analytics = PlayAnalytics()
+
+# The first sync aggregates the whole plays history, so it runs off the Tk thread
+play_analytics_loader = None  # Started by the first tab that needs play counts
+play_analytics_loaded = False  # Set by poll_changes once the loader has finished
+
+# Players whose Most Played Game may be out of date in Player Tracking; None means every player
+stale_player_games = set()
+
+def sync_play_analytics():
+    global play_analytics_loader, stale_player_games
+    if play_analytics_loader is None:
+        play_analytics_loader = threading.Thread(target=play_analytics.sync_from_db, daemon=True)
+        play_analytics_loader.start()
+    elif play_analytics_loaded:
+        usernames = play_analytics.sync_from_db()  # Only reads plays recorded since the last sync
+        if usernames is None:
+            stale_player_games = None
+        elif stale_player_games is not None and player_data:
+            stale_player_games |= usernames
+
+# Player data is generated when the Player Tracking tab is first opened
+player_data = []
+
+def build_player_tab():
+    global player_tracking_list
+
+    # Player Tracking List
+    player_tracking_list = ttk.Treeview(players_frame, columns=('Player', 'Score', 'Revenue', 'Arcade', 'Most Played Game', 'Event Placement', 'Tournament Winner'), show='headings')
+    player_tracking_list.heading('Player', text='Player')
+    player_tracking_list.heading('Score', text='Score')
+    player_tracking_list.heading('Revenue', text='Revenue')
+    player_tracking_list.heading('Arcade', text='Arcade')
+    player_tracking_list.heading('Most Played Game', text='Most Played Game')
+    player_tracking_list.heading('Event Placement', text='Event Placement')
+    player_tracking_list.heading('Tournament Winner', text='Tournament Winner')
+    player_tracking_list.pack(expand=True, fill='both')
+
+    ensure_leaderboard()
+    refresh_player_tracking()
+    bus.subscribe(['leaderboard', 'arcades'], lambda tables: refresh_player_tracking())
+    # Plays arrive constantly, so they only update the Most Played Game of the players who played
+    bus.subscribe(['plays'], lambda tables: refresh_most_played_games())
 
 # Function to display player data in the Player Tracking tab
 def display_player_tracking():
@@ -763,13 +699,99 @@ def display_player_tracking():
 
     for player in sorted_players:
         crown_symbol = "👑" if player.event_placement == 1 else ""
-        player_tracking_list.insert('', 'end', values=(player.username, player.score, f"${player.revenue:.2f}", player.arcade, player.most_played_game, player.event_placement, crown_symbol))
-
-# Function to display player tracking
-display_player_tracking()
-
-# Start the score updates
-update_scores()
+        player_tracking_list.insert('', 'end', iid=player.username, values=(player.username, player.score, f"${player.revenue:.2f}", player.arcade, player.most_played_game, player.event_placement, crown_symbol))
+
+# Function to rebuild player data after the tables it is drawn from change
+def refresh_player_tracking():
+    global player_data, stale_player_games
+    sync_play_analytics()
+    player_data = generate_player_data()
+    stale_player_games = set()
+    display_player_tracking()
+
+# Function to update the Most Played Game column after new plays, leaving the other columns alone
+def refresh_most_played_games():
+    global stale_player_games
+    sync_play_analytics()
+    stale, stale_player_games = stale_player_games, set()
+    for player in player_data:
+        if stale is None or player.username in stale:
+            player.most_played_game = play_analytics.most_played_game(player.username) or 'N/A'
+            player_tracking_list.set(player.username, 'Most Played Game', player.most_played_game)
+
+# Revenue Tracking: busiest machines over the last hour of plays and most played games overall
+def build_revenue_tab():
+    global busiest_machine_list, most_played_list
+
+    ttk.Label(revenue_frame, text="Busiest Machines (hour up to the latest play)").pack(pady=5)
+    busiest_machine_list = ttk.Treeview(revenue_frame, columns=('Machine', 'Game Title', 'Plays', 'Utilization'), show='headings')
+    busiest_machine_list.heading('Machine', text='Machine')
+    busiest_machine_list.heading('Game Title', text='Game Title')
+    busiest_machine_list.heading('Plays', text='Plays')
+    busiest_machine_list.heading('Utilization', text='Utilization')
+    busiest_machine_list.pack(expand=True, fill='both')
+
+    ttk.Label(revenue_frame, text="Most Played Games").pack(pady=5)
+    most_played_list = ttk.Treeview(revenue_frame, columns=('Game Title', 'Plays'), show='headings')
+    most_played_list.heading('Game Title', text='Game Title')
+    most_played_list.heading('Plays', text='Plays')
+    most_played_list.pack(expand=True, fill='both')
+
+    display_play_analytics()
+    bus.subscribe(['plays'], lambda tables: display_play_analytics())
+
+# Function to display machine utilization and game popularity
+def display_play_analytics():
+    sync_play_analytics()
+
+    for item in busiest_machine_list.get_children():
+        busiest_machine_list.delete(item)
+    # The window ends at the latest recorded play, so replayed or simulated history still shows up
+    for machine_id, game_title, plays, utilization in play_analytics.busiest_machines(20):
+        busiest_machine_list.insert('', 'end', values=(machine_id, game_title, plays, f"{utilization:.0%}"))
+
+    for item in most_played_list.get_children():
+        most_played_list.delete(item)
+    for game_title, plays in play_analytics.most_played_games(20):
+        most_played_list.insert('', 'end', values=(game_title, plays))
+
+# Tabs are built and populated the first time they are selected
+tab_builders = {
+    str(global_frame): build_global_tab,
+    str(regional_frame): build_regional_tab,
+    str(local_frame): build_local_tab,
+    str(leaderboard_frame): build_leaderboard_tab,
+    str(players_frame): build_player_tab,
+    str(revenue_frame): build_revenue_tab,
+}
+
+# Function to build the selected tab (and the selected sub-tab of Managing Operations)
+def build_selected_tab(event=None):
+    selected = notebook.select()
+    if selected == str(operations_frame):
+        selected = operations_notebook.select()
+    builder = tab_builders.pop(selected, None)
+    if builder is not None:
+        builder()
+
+notebook.bind("<<NotebookTabChanged>>", build_selected_tab)
+operations_notebook.bind("<<NotebookTabChanged>>", build_selected_tab)
+
+# Function to check for database changes from this or other instances
+def poll_changes():
+    global play_analytics_loaded, stale_player_games
+    try:
+        watcher.poll()
+        if play_analytics_loader is not None and not play_analytics_loaded and not play_analytics_loader.is_alive():
+            play_analytics_loaded = True
+            stale_player_games = None  # The loaded history can change any player's most played game
+            bus.publish(['plays'])  # Redraw the play counts tabs now the history is loaded
+    finally:
+        root.after(500, poll_changes)  # PRAGMA data_version is cheap, so poll often; keep polling after errors
+
+# Build the tab shown at launch and record the current table versions
+build_selected_tab()
+poll_changes()
 
 # Start the application
 root.mainloop()
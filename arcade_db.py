@@ -0,0 +1,566 @@
+import sqlite3
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+DB_PATH = 'arcade_management.db'
+DEFAULT_REGIONS = ["North America", "Europe East", "Europe West", "Asia", "Other"]
+
+# Tables whose writes bump a row in table_versions, so readers can tell what changed
+WATCHED_TABLES = ('regions', 'arcades', 'machines', 'leaderboard', 'plays')
+
+# Connection pool so the GUI and the API server share a bounded set of connections
+class ConnectionPool:
+    def __init__(self, db_path=DB_PATH, size=8, timeout=30.0):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+        # Wait accounting for soak tests, updated under _lock
+        self.acquires = 0
+        self.pool_wait_seconds = 0.0
+        self.write_transactions = 0
+        self.lock_wait_seconds = 0.0
+        self.max_lock_wait_seconds = 0.0
+        self.busy_errors = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')  # Readers no longer block the single writer
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._connect()
+        start = time.perf_counter()
+        conn = self._idle.get(timeout=self.timeout)  # Wait for another thread to hand one back
+        with self._lock:
+            self.pool_wait_seconds += time.perf_counter() - start
+        return conn
+
+    # Take the write lock up front so a reader never has to upgrade (which fails instead of waiting)
+    def _begin_write(self, conn):
+        start = time.perf_counter()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+        except sqlite3.OperationalError:
+            with self._lock:
+                self.busy_errors += 1
+            raise
+        waited = time.perf_counter() - start
+        with self._lock:
+            self.write_transactions += 1
+            self.lock_wait_seconds += waited
+            self.max_lock_wait_seconds = max(self.max_lock_wait_seconds, waited)
+
+    # Borrow a connection; commits on success and rolls back on error
+    @contextmanager
+    def connection(self, write=False):
+        conn = self._acquire()
+        with self._lock:
+            self.acquires += 1
+        try:
+            if write:
+                self._begin_write(conn)
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    # Snapshot of the wait counters
+    def stats(self):
+        with self._lock:
+            return {
+                'acquires': self.acquires,
+                'pool_wait_seconds': self.pool_wait_seconds,
+                'write_transactions': self.write_transactions,
+                'lock_wait_seconds': self.lock_wait_seconds,
+                'max_lock_wait_seconds': self.max_lock_wait_seconds,
+                'busy_errors': self.busy_errors,
+            }
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+pool = ConnectionPool()
+
+# Point the data layer at a different database (used by the API server and load test)
+def configure_pool(db_path=DB_PATH, size=8):
+    global pool
+    pool.close()
+    pool = ConnectionPool(db_path, size)
+    return pool
+
+# Database setup
+def initialize_db():
+    with pool.connection(write=True) as conn:
+        cursor = conn.cursor()
+
+        # Create tables if they do not exist
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS regions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS arcades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                arcade_id TEXT NOT NULL,
+                location TEXT NOT NULL,
+                region_id INTEGER,
+                FOREIGN KEY (region_id) REFERENCES regions (id)
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS machines (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                machine_id TEXT NOT NULL,
+                machine_type TEXT NOT NULL,
+                token_cost REAL NOT NULL,
+                arcade_id TEXT NOT NULL,
+                FOREIGN KEY (arcade_id) REFERENCES arcades (arcade_id)
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS leaderboard (
+                username TEXT PRIMARY KEY,
+                score INTEGER NOT NULL
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS plays (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT NOT NULL,
+                machine_id TEXT NOT NULL,
+                tokens REAL NOT NULL,
+                played_at REAL NOT NULL
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tournament_entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_name TEXT NOT NULL,
+                username TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                entered_at REAL NOT NULL
+            )
+        ''')
+
+        # Check if the token_cost column exists, and if not, add it
+        cursor.execute("PRAGMA table_info(machines)")
+        columns = [column[1] for column in cursor.fetchall()]
+        if 'token_cost' not in columns:
+            cursor.execute("ALTER TABLE machines ADD COLUMN token_cost REAL NOT NULL DEFAULT 0")
+
+        # Lookups used by every list and revenue query
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_arcades_region ON arcades (region_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_arcades_arcade_id ON arcades (arcade_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_machines_arcade ON machines (arcade_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_machines_machine_id ON machines (machine_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_plays_machine ON plays (machine_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_plays_played_at ON plays (played_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tournament_entries_event ON tournament_entries (event_name)')
+
+        # Per-table change counters, bumped by triggers so writes from any process are seen
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS table_versions (
+                table_name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        for table in WATCHED_TABLES:
+            cursor.execute('INSERT OR IGNORE INTO table_versions (table_name) VALUES (?)', (table,))
+            for operation in ('INSERT', 'UPDATE', 'DELETE'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {table}_{operation.lower()}_version
+                    AFTER {operation} ON {table}
+                    BEGIN
+                        UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+                    END
+                ''')
+
+# Function to read the change counter of every watched table
+def get_table_versions():
+    with pool.connection() as conn:
+        return dict(conn.execute('SELECT table_name, version FROM table_versions'))
+
+# Regions
+
+# Function to add a region to the database
+def add_region_to_db(region_name):
+    with pool.connection(write=True) as conn:
+        conn.execute('INSERT OR IGNORE INTO regions (name) VALUES (?)', (region_name,))
+
+# Function to list region names
+def get_region_names():
+    with pool.connection() as conn:
+        return [row[0] for row in conn.execute('SELECT name FROM regions')]
+
+# Arcades
+
+# Function to add an arcade to the database, returns False if the region is unknown
+def add_arcade_to_db(arcade_id, location, region_name):
+    with pool.connection(write=True) as conn:
+        cursor = conn.cursor()
+
+        # Get the region ID
+        cursor.execute('SELECT id FROM regions WHERE name = ?', (region_name,))
+        region_id = cursor.fetchone()
+
+        if not region_id:
+            return False
+        cursor.execute('INSERT INTO arcades (arcade_id, location, region_id) VALUES (?, ?, ?)',
+                       (arcade_id, location, region_id[0]))
+        return True
+
+# Function to list arcades, optionally only those in one region
+def get_arcades(region_name=None):
+    with pool.connection() as conn:
+        if region_name is None:
+            cursor = conn.execute('''
+                SELECT arcades.arcade_id, arcades.location, regions.name FROM arcades
+                LEFT JOIN regions ON arcades.region_id = regions.id
+            ''')
+        else:
+            cursor = conn.execute('''
+                SELECT arcades.arcade_id, arcades.location, regions.name FROM arcades
+                JOIN regions ON arcades.region_id = regions.id
+                WHERE regions.name = ?
+            ''', (region_name,))
+        return cursor.fetchall()
+
+# Function to fetch one arcade as (arcade_id, location, region) or None, optionally in one region
+def get_arcade(arcade_id, region_name=None):
+    with pool.connection() as conn:
+        if region_name is None:
+            cursor = conn.execute('''
+                SELECT arcades.arcade_id, arcades.location, regions.name FROM arcades
+                LEFT JOIN regions ON arcades.region_id = regions.id
+                WHERE arcades.arcade_id = ?
+            ''', (arcade_id,))
+        else:
+            cursor = conn.execute('''
+                SELECT arcades.arcade_id, arcades.location, regions.name FROM arcades
+                JOIN regions ON arcades.region_id = regions.id
+                WHERE arcades.arcade_id = ? AND regions.name = ?
+            ''', (arcade_id, region_name))
+        return cursor.fetchone()
+
+# Function to list the regions an arcade ID is used in (arcade IDs are only unique within a region)
+def get_arcade_regions(arcade_id):
+    with pool.connection() as conn:
+        cursor = conn.execute('''
+            SELECT DISTINCT regions.name FROM arcades
+            JOIN regions ON arcades.region_id = regions.id
+            WHERE arcades.arcade_id = ?
+        ''', (arcade_id,))
+        return [row[0] for row in cursor]
+
+# Function to gather arcade names
+def get_arcade_names():
+    with pool.connection() as conn:
+        return [row[0] for row in conn.execute('SELECT arcade_id FROM arcades')]
+
+# Function to change an arcade's location, optionally only in one region; returns the number of rows updated
+def update_arcade_location(arcade_id, new_location, region_name=None):
+    with pool.connection(write=True) as conn:
+        if region_name is None:
+            cursor = conn.execute('UPDATE arcades SET location = ? WHERE arcade_id = ?',
+                                  (new_location, arcade_id))
+        else:
+            cursor = conn.execute('''
+                UPDATE arcades SET location = ?
+                WHERE arcade_id = ? AND region_id = (SELECT id FROM regions WHERE name = ?)
+            ''', (new_location, arcade_id, region_name))
+        return cursor.rowcount
+
+# Function to delete an arcade in a region and its machines, returns the number of arcade rows deleted
+def delete_arcade_from_db(arcade_id, region_name):
+    return delete_arcades_from_db(region_name, [arcade_id])[0]
+
+# Function to retire many arcades of one region with all their machines in one transaction
+# Returns (arcades deleted, machines deleted)
+def delete_arcades_from_db(region_name, arcade_ids):
+    params = [(arcade_id, region_name) for arcade_id in arcade_ids]
+    with pool.connection(write=True) as conn:
+        arcades_deleted = conn.executemany('''
+            DELETE FROM arcades
+            WHERE arcade_id = ? AND region_id = (SELECT id FROM regions WHERE name = ?)
+        ''', params).rowcount
+        # machines.arcade_id can't be a real foreign key (arcade_id isn't unique), so cascade by hand,
+        # leaving machines alone while an arcade with the same ID remains in another region
+        machines_deleted = conn.executemany('''
+            DELETE FROM machines
+            WHERE arcade_id = ? AND NOT EXISTS (SELECT 1 FROM arcades WHERE arcades.arcade_id = ?)
+        ''', [(arcade_id, arcade_id) for arcade_id in arcade_ids]).rowcount
+        return arcades_deleted, machines_deleted
+
+# Function to count the machines that deleting a region's arcades would delete with them
+def count_machines_in_arcades(region_name, arcade_ids):
+    arcade_ids = list(arcade_ids)
+    total = 0
+    with pool.connection() as conn:
+        for start in range(0, len(arcade_ids), 500):  # Stay under SQLite's bound-parameter limit
+            chunk = arcade_ids[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            total += conn.execute(f'''
+                SELECT COUNT(*) FROM machines
+                WHERE arcade_id IN ({placeholders}) AND NOT EXISTS (
+                    SELECT 1 FROM arcades
+                    WHERE arcades.arcade_id = machines.arcade_id
+                    AND arcades.region_id IS NOT (SELECT id FROM regions WHERE name = ?)
+                )
+            ''', [*chunk, region_name]).fetchone()[0]
+    return total
+
+# Machines
+
+# Function to add a machine to the database
+def add_machine_to_db(machine_name, game_title, token_cost, arcade_id):
+    with pool.connection(write=True) as conn:
+        conn.execute('''
+            INSERT INTO machines (machine_id, machine_type, token_cost, arcade_id)
+            VALUES (?, ?, ?, ?)
+        ''', (machine_name, game_title, token_cost, arcade_id))
+
+# Function to list machines as (machine_id, machine_type, token_cost, arcade_id), optionally for one arcade
+def get_machines(arcade_id=None):
+    with pool.connection() as conn:
+        if arcade_id is None:
+            cursor = conn.execute('SELECT machine_id, machine_type, token_cost, arcade_id FROM machines')
+        else:
+            cursor = conn.execute('''
+                SELECT machine_id, machine_type, token_cost, arcade_id FROM machines
+                WHERE arcade_id = ?
+            ''', (arcade_id,))
+        return cursor.fetchall()
+
+# Function to fetch one machine or None, optionally in one arcade
+def get_machine(machine_id, arcade_id=None):
+    with pool.connection() as conn:
+        if arcade_id is None:
+            cursor = conn.execute('''
+                SELECT machine_id, machine_type, token_cost, arcade_id FROM machines
+                WHERE machine_id = ?
+            ''', (machine_id,))
+        else:
+            cursor = conn.execute('''
+                SELECT machine_id, machine_type, token_cost, arcade_id FROM machines
+                WHERE machine_id = ? AND arcade_id = ?
+            ''', (machine_id, arcade_id))
+        return cursor.fetchone()
+
+# Function to list the arcades a machine ID is used in (machine IDs are only unique within an arcade)
+def get_machine_arcades(machine_id):
+    with pool.connection() as conn:
+        return [row[0] for row in conn.execute('SELECT DISTINCT arcade_id FROM machines WHERE machine_id = ?',
+                                               (machine_id,))]
+
+# Function to change a machine's type and token cost, optionally only in one arcade
+# Returns the number of rows updated
+def update_machine(machine_id, new_type, new_cost, arcade_id=None):
+    with pool.connection(write=True) as conn:
+        if arcade_id is None:
+            cursor = conn.execute('''
+                UPDATE machines
+                SET machine_type = ?, token_cost = ?
+                WHERE machine_id = ?
+            ''', (new_type, new_cost, machine_id))
+        else:
+            cursor = conn.execute('''
+                UPDATE machines
+                SET machine_type = ?, token_cost = ?
+                WHERE machine_id = ? AND arcade_id = ?
+            ''', (new_type, new_cost, machine_id, arcade_id))
+        return cursor.rowcount
+
+# Function to change the type and/or token cost of many machines of one arcade in one transaction
+# Fields left as None keep their current value; returns the number of rows updated
+def update_machines(arcade_id, machine_ids, new_type=None, new_cost=None):
+    assignments, values = [], []
+    if new_type is not None:
+        assignments.append('machine_type = ?')
+        values.append(new_type)
+    if new_cost is not None:
+        assignments.append('token_cost = ?')
+        values.append(new_cost)
+    if not assignments:
+        return 0
+    with pool.connection(write=True) as conn:
+        cursor = conn.executemany(
+            f'UPDATE machines SET {", ".join(assignments)} WHERE machine_id = ? AND arcade_id = ?',
+            [(*values, machine_id, arcade_id) for machine_id in machine_ids])
+        return cursor.rowcount
+
+# Function to delete a machine, optionally only in one arcade; returns the number of rows deleted
+def delete_machine_from_db(machine_id, arcade_id=None):
+    with pool.connection(write=True) as conn:
+        if arcade_id is None:
+            cursor = conn.execute('DELETE FROM machines WHERE machine_id = ?', (machine_id,))
+        else:
+            cursor = conn.execute('DELETE FROM machines WHERE machine_id = ? AND arcade_id = ?',
+                                  (machine_id, arcade_id))
+        return cursor.rowcount
+
+# Function to delete many machines of one arcade in one transaction, returns the number of rows deleted
+def delete_machines_from_db(arcade_id, machine_ids):
+    with pool.connection(write=True) as conn:
+        cursor = conn.executemany('DELETE FROM machines WHERE machine_id = ? AND arcade_id = ?',
+                                  [(machine_id, arcade_id) for machine_id in machine_ids])
+        return cursor.rowcount
+
+# Leaderboard
+
+# Function to gather player scores, highest first
+def get_player_data(limit=None):
+    with pool.connection() as conn:
+        if limit is None:
+            cursor = conn.execute('SELECT username, score FROM leaderboard ORDER BY score DESC')
+        else:
+            cursor = conn.execute('SELECT username, score FROM leaderboard ORDER BY score DESC LIMIT ?',
+                                  (limit,))
+        return cursor.fetchall()
+
+# Function to fetch a single player's score or None
+def get_player_score(username):
+    with pool.connection() as conn:
+        row = conn.execute('SELECT score FROM leaderboard WHERE username = ?', (username,)).fetchone()
+        return row[0] if row else None
+
+# Save scores for the leaderboard from a {username: score} dict
+def save_scores_to_db(scores):
+    with pool.connection(write=True) as conn:
+        conn.executemany('INSERT OR REPLACE INTO leaderboard (username, score) VALUES (?, ?)',
+                         scores.items())
+
+# Function to add points to scores from (username, change) pairs, never going below 0
+# Reads and writes each score in SQL so changes from other instances aren't overwritten
+def adjust_scores(changes):
+    with pool.connection(write=True) as conn:
+        cursor = conn.executemany('UPDATE leaderboard SET score = MAX(0, score + ?) WHERE username = ?',
+                                  [(change, username) for username, change in changes])
+        return cursor.rowcount
+
+# Function to replace every leaderboard score in one transaction, so readers never see an empty board
+def replace_leaderboard(scores):
+    with pool.connection(write=True) as conn:
+        conn.execute('DELETE FROM leaderboard')
+        conn.executemany('INSERT OR REPLACE INTO leaderboard (username, score) VALUES (?, ?)', scores.items())
+
+# Plays and tournaments
+
+# Function to record a play of a machine by a player, returns (play id, played_at)
+def record_play(username, machine_id, tokens, played_at=None):
+    played_at = time.time() if played_at is None else played_at
+    with pool.connection(write=True) as conn:
+        cursor = conn.execute('INSERT INTO plays (username, machine_id, tokens, played_at) VALUES (?, ?, ?, ?)',
+                              (username, machine_id, tokens, played_at))
+        return cursor.lastrowid, played_at
+
+# Stream plays after a given play id as (id, username, machine_id, game title, played_at), in batches
+def iter_plays(after_id=0, batch_size=5000):
+    while True:
+        with pool.connection() as conn:
+            rows = conn.execute('''
+                SELECT plays.id, plays.username, plays.machine_id,
+                       COALESCE((SELECT machine_type FROM machines WHERE machines.machine_id = plays.machine_id LIMIT 1),
+                                'Unknown Game'),
+                       plays.played_at
+                FROM plays
+                WHERE plays.id > ?
+                ORDER BY plays.id
+                LIMIT ?
+            ''', (after_id, batch_size)).fetchall()
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        after_id = rows[-1][0]
+
+# Function to summarize the plays table without reading every play, for seeding analytics
+# Returns (last play id, latest played_at, [(machine_id, game title, plays)],
+#          [(username, game title, plays)],
+#          [(machine_id, bucket index, plays)] for buckets of bucket_seconds in the last window_seconds)
+def get_play_totals(window_seconds, bucket_seconds):
+    with pool.connection() as conn:
+        last_id, latest_play = conn.execute('SELECT MAX(id), MAX(played_at) FROM plays').fetchone()
+        if last_id is None:
+            return 0, 0.0, [], [], []
+        # Bound every query by last_id so plays committed meanwhile are left for the next sync
+        machine_totals = conn.execute('''
+            SELECT totals.machine_id,
+                   COALESCE((SELECT machine_type FROM machines WHERE machines.machine_id = totals.machine_id LIMIT 1),
+                            'Unknown Game'),
+                   totals.plays
+            FROM (SELECT machine_id, COUNT(*) AS plays FROM plays WHERE id <= ? GROUP BY machine_id) AS totals
+        ''', (last_id,)).fetchall()
+        player_totals = conn.execute('''
+            SELECT totals.username,
+                   COALESCE((SELECT machine_type FROM machines WHERE machines.machine_id = totals.machine_id LIMIT 1),
+                            'Unknown Game') AS game_title,
+                   SUM(totals.plays) AS plays
+            FROM (SELECT username, machine_id, COUNT(*) AS plays FROM plays
+                  WHERE id <= ? GROUP BY username, machine_id) AS totals
+            GROUP BY totals.username, game_title
+        ''', (last_id,)).fetchall()
+        recent = conn.execute('''
+            SELECT machine_id, CAST(played_at / ? AS INTEGER), COUNT(*) FROM plays
+            WHERE id <= ? AND played_at > ?
+            GROUP BY 1, 2
+        ''', (bucket_seconds, last_id, latest_play - window_seconds)).fetchall()
+        return last_id, latest_play, machine_totals, player_totals, recent
+
+# Function to enter a player into a tournament
+def add_tournament_entry(event_name, username, score, entered_at=None):
+    with pool.connection(write=True) as conn:
+        conn.execute('INSERT INTO tournament_entries (event_name, username, score, entered_at) VALUES (?, ?, ?, ?)',
+                     (event_name, username, score, time.time() if entered_at is None else entered_at))
+
+# Revenue
+
+# Function to gather machine count and average token cost per arcade in a region
+def fetch_arcade_data(region):
+    with pool.connection() as conn:
+        cursor = conn.execute('''
+            SELECT arcades.arcade_id, COUNT(machines.machine_id), AVG(machines.token_cost)
+            FROM arcades
+            LEFT JOIN machines ON arcades.arcade_id = machines.arcade_id
+            WHERE arcades.region_id = (SELECT id FROM regions WHERE name = ?)
+            GROUP BY arcades.arcade_id
+        ''', (region,))
+        return cursor.fetchall()
+
+# Estimate revenue per arcade from its machine count, pass a seeded rng for repeatable figures
+def calculate_revenue(arcade_data, rng=random):
+    revenue_data = []
+    for arcade in arcade_data:
+        arcade_name, num_machines, avg_token_cost = arcade
+        total_revenue = sum(rng.uniform(50.00, 1200.00) for _ in range(num_machines))
+        revenue_data.append((arcade_name, num_machines, avg_token_cost, total_revenue))
+    return revenue_data
@@ -0,0 +1,383 @@
+import argparse
+import json
+import math
+import queue
+import re
+import socket
+import sqlite3
+import threading
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import arcade_db
+
+# HTTP server with one thread per connection; the database pool is what bounds concurrent queries
+class ArcadeHTTPServer(ThreadingHTTPServer):
+    daemon_threads = False  # server_close joins handler threads, so in-flight requests finish their writes
+
+    def __init__(self, server_address, handler_class):
+        super().__init__(server_address, handler_class)
+        self.open_requests = set()
+        self.open_requests_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self.open_requests_lock:
+            self.open_requests.add(request)
+        super().process_request(request, client_address)
+
+    def shutdown_request(self, request):
+        with self.open_requests_lock:
+            self.open_requests.discard(request)
+        super().shutdown_request(request)
+
+    def server_close(self):
+        # Wake idle keep-alive connections first, or joining their handler threads would wait on them
+        with self.open_requests_lock:
+            for request in self.open_requests:
+                try:
+                    request.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        super().server_close()
+
+# Raised by route handlers to send an error status back to the client
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+# Helpers to turn data layer rows into JSON objects
+def arcade_to_json(row):
+    arcade_id, location, region = row
+    return {'arcade_id': arcade_id, 'location': location, 'region': region}
+
+def machine_to_json(row):
+    machine_id, machine_type, token_cost, arcade_id = row
+    return {'machine_id': machine_id, 'machine_type': machine_type,
+            'token_cost': token_cost, 'arcade_id': arcade_id}
+
+# Ids, names and numbers in a request body must be plain JSON strings or numbers
+def is_scalar(value):
+    return isinstance(value, (str, int, float)) and not isinstance(value, bool)
+
+def require_fields(body, *fields):
+    missing = [field for field in fields if body.get(field) in (None, '')]
+    if missing:
+        raise ApiError(400, f"Missing fields: {', '.join(missing)}")
+    for field in fields:
+        if not is_scalar(body[field]):
+            raise ApiError(400, f"'{field}' must be a string or number")
+    return [body[field] for field in fields]
+
+# SQLite stores integers in 64 bits
+MIN_INTEGER, MAX_INTEGER = -2 ** 63, 2 ** 63 - 1
+
+def parse_number(value, name, kind=float):
+    try:
+        number = kind(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ApiError(400, f"'{name}' must be a number")
+    if not math.isfinite(number):  # NaN would be stored as NULL
+        raise ApiError(400, f"'{name}' must be a finite number")
+    if kind is int and not MIN_INTEGER <= number <= MAX_INTEGER:
+        raise ApiError(400, f"'{name}' is out of range")
+    return number
+
+# Route handlers, each takes (query, body, *path_args) and returns (status, payload)
+def list_regions(query, body):
+    return 200, arcade_db.get_region_names()
+
+def list_arcades(query, body):
+    region = query.get('region')
+    return 200, [arcade_to_json(row) for row in arcade_db.get_arcades(region)]
+
+def create_arcade(query, body):
+    arcade_id, location, region = require_fields(body, 'arcade_id', 'location', 'region')
+    if not arcade_db.add_arcade_to_db(arcade_id, location, region):
+        raise ApiError(404, f"Region '{region}' not found")
+    return 201, arcade_to_json((arcade_id, location, region))
+
+# Arcade IDs are only unique within a region: pass ?region= when one is used in several
+def resolve_region(query, arcade_id):
+    if 'region' in query:
+        return query['region']
+    regions = arcade_db.get_arcade_regions(arcade_id)
+    if not regions:
+        raise ApiError(404, f"Arcade '{arcade_id}' not found")
+    if len(regions) > 1:
+        raise ApiError(409, f"Arcade '{arcade_id}' exists in several regions, pass ?region=")
+    return regions[0]
+
+def show_arcade(query, body, arcade_id):
+    row = arcade_db.get_arcade(arcade_id, query.get('region'))
+    if row is None:
+        raise ApiError(404, f"Arcade '{arcade_id}' not found")
+    return 200, arcade_to_json(row)
+
+def edit_arcade(query, body, arcade_id):
+    location, = require_fields(body, 'location')
+    region = resolve_region(query, arcade_id)
+    if not arcade_db.update_arcade_location(arcade_id, location, region):
+        raise ApiError(404, f"Arcade '{arcade_id}' not found in {region}")
+    return 200, arcade_to_json(arcade_db.get_arcade(arcade_id, region))
+
+def remove_arcade(query, body, arcade_id):
+    region = resolve_region(query, arcade_id)
+    if not arcade_db.delete_arcade_from_db(arcade_id, region):
+        raise ApiError(404, f"Arcade '{arcade_id}' not found in {region}")
+    return 200, {'deleted': arcade_id, 'region': region}
+
+def require_id_list(body, field):
+    ids = body.get(field)
+    if ids in (None, ''):
+        raise ApiError(400, f"Missing fields: {field}")
+    if not isinstance(ids, list) or not all(is_scalar(item) for item in ids):
+        raise ApiError(400, f"'{field}' must be a list of ids")
+    return ids
+
+# Retire many arcades of one region and their machines in one transaction
+def remove_arcades(query, body):
+    region, = require_fields(body, 'region')
+    arcades_deleted, machines_deleted = arcade_db.delete_arcades_from_db(region, require_id_list(body, 'arcade_ids'))
+    return 200, {'arcades_deleted': arcades_deleted, 'machines_deleted': machines_deleted}
+
+def list_machines(query, body):
+    arcade_id = query.get('arcade_id')
+    return 200, [machine_to_json(row) for row in arcade_db.get_machines(arcade_id)]
+
+def create_machine(query, body):
+    machine_id, machine_type, token_cost, arcade_id = require_fields(
+        body, 'machine_id', 'machine_type', 'token_cost', 'arcade_id')
+    token_cost = parse_number(token_cost, 'token_cost')
+    if arcade_db.get_arcade(arcade_id) is None:
+        raise ApiError(404, f"Arcade '{arcade_id}' not found")
+    arcade_db.add_machine_to_db(machine_id, machine_type, token_cost, arcade_id)
+    return 201, machine_to_json((machine_id, machine_type, token_cost, arcade_id))
+
+# Machine IDs are only unique within an arcade: pass ?arcade_id= when one is used in several
+def resolve_arcade(query, machine_id):
+    if 'arcade_id' in query:
+        return query['arcade_id']
+    arcade_ids = arcade_db.get_machine_arcades(machine_id)
+    if not arcade_ids:
+        raise ApiError(404, f"Machine '{machine_id}' not found")
+    if len(arcade_ids) > 1:
+        raise ApiError(409, f"Machine '{machine_id}' exists in several arcades, pass ?arcade_id=")
+    return arcade_ids[0]
+
+def show_machine(query, body, machine_id):
+    row = arcade_db.get_machine(machine_id, query.get('arcade_id'))
+    if row is None:
+        raise ApiError(404, f"Machine '{machine_id}' not found")
+    return 200, machine_to_json(row)
+
+def edit_machine(query, body, machine_id):
+    machine_type, token_cost = require_fields(body, 'machine_type', 'token_cost')
+    token_cost = parse_number(token_cost, 'token_cost')
+    arcade_id = resolve_arcade(query, machine_id)
+    if not arcade_db.update_machine(machine_id, machine_type, token_cost, arcade_id):
+        raise ApiError(404, f"Machine '{machine_id}' not found in arcade '{arcade_id}'")
+    return 200, machine_to_json(arcade_db.get_machine(machine_id, arcade_id))
+
+def remove_machine(query, body, machine_id):
+    arcade_id = resolve_arcade(query, machine_id)
+    if not arcade_db.delete_machine_from_db(machine_id, arcade_id):
+        raise ApiError(404, f"Machine '{machine_id}' not found in arcade '{arcade_id}'")
+    return 200, {'deleted': machine_id, 'arcade_id': arcade_id}
+
+# Change type and/or token cost of many machines of one arcade in one transaction
+def edit_machines(query, body):
+    arcade_id, = require_fields(body, 'arcade_id')
+    machine_ids = require_id_list(body, 'machine_ids')
+    machine_type = body.get('machine_type') or None
+    if machine_type is not None and not is_scalar(machine_type):
+        raise ApiError(400, "'machine_type' must be a string or number")
+    token_cost = body.get('token_cost')
+    if token_cost is not None:
+        token_cost = parse_number(token_cost, 'token_cost')
+    if machine_type is None and token_cost is None:
+        raise ApiError(400, "Missing fields: machine_type or token_cost")
+    return 200, {'updated': arcade_db.update_machines(arcade_id, machine_ids, machine_type, token_cost)}
+
+def remove_machines(query, body):
+    arcade_id, = require_fields(body, 'arcade_id')
+    return 200, {'deleted': arcade_db.delete_machines_from_db(arcade_id, require_id_list(body, 'machine_ids'))}
+
+# Cabinets report each credit played here, feeding the play analytics
+def create_play(query, body):
+    username, machine_id, tokens = require_fields(body, 'username', 'machine_id', 'tokens')
+    tokens = parse_number(tokens, 'tokens')
+    played_at = body.get('played_at')
+    if played_at is not None:
+        played_at = parse_number(played_at, 'played_at')
+    if arcade_db.get_machine(machine_id) is None:
+        raise ApiError(404, f"Machine '{machine_id}' not found")
+    play_id, played_at = arcade_db.record_play(username, machine_id, tokens, played_at)
+    return 201, {'play_id': play_id, 'username': username, 'machine_id': machine_id,
+                 'tokens': tokens, 'played_at': played_at}
+
+def show_leaderboard(query, body):
+    limit = query.get('limit')
+    if limit is not None:
+        limit = parse_number(limit, 'limit', int)
+        if limit < 0:
+            raise ApiError(400, "'limit' must not be negative")  # SQLite treats a negative LIMIT as none
+    rows = arcade_db.get_player_data(limit)
+    return 200, [{'username': username, 'score': score} for username, score in rows]
+
+def show_score(query, body, username):
+    score = arcade_db.get_player_score(username)
+    if score is None:
+        raise ApiError(404, f"Player '{username}' not found")
+    return 200, {'username': username, 'score': score}
+
+def set_score(query, body, username):
+    score, = require_fields(body, 'score')
+    score = max(0, parse_number(score, 'score', int))  # Scores never go below 0, same as the GUI
+    arcade_db.save_scores_to_db({username: score})
+    return 200, {'username': username, 'score': score}
+
+def show_revenue(query, body):
+    regions = [query['region']] if 'region' in query else arcade_db.get_region_names()
+    result = []
+    for region in regions:
+        for arcade_name, num_machines, avg_token_cost, total_revenue in \
+                arcade_db.calculate_revenue(arcade_db.fetch_arcade_data(region)):
+            result.append({'region': region, 'arcade_id': arcade_name, 'machines': num_machines,
+                           'avg_token_cost': round(avg_token_cost or 0.0, 2),
+                           'total_revenue': round(total_revenue, 2)})
+    return 200, result
+
+# Terminals poll this to refetch only the tables that changed
+def show_versions(query, body):
+    return 200, arcade_db.get_table_versions()
+
+ROUTES = [
+    ('GET', r'/regions', list_regions),
+    ('GET', r'/arcades', list_arcades),
+    ('POST', r'/arcades', create_arcade),
+    ('POST', r'/arcades/batch-delete', remove_arcades),
+    ('GET', r'/arcades/([^/]+)', show_arcade),
+    ('PUT', r'/arcades/([^/]+)', edit_arcade),
+    ('DELETE', r'/arcades/([^/]+)', remove_arcade),
+    ('GET', r'/machines', list_machines),
+    ('POST', r'/machines', create_machine),
+    ('POST', r'/machines/batch-update', edit_machines),
+    ('POST', r'/machines/batch-delete', remove_machines),
+    ('GET', r'/machines/([^/]+)', show_machine),
+    ('PUT', r'/machines/([^/]+)', edit_machine),
+    ('DELETE', r'/machines/([^/]+)', remove_machine),
+    ('POST', r'/plays', create_play),
+    ('GET', r'/leaderboard', show_leaderboard),
+    ('GET', r'/leaderboard/([^/]+)', show_score),
+    ('PUT', r'/leaderboard/([^/]+)', set_score),
+    ('GET', r'/revenue', show_revenue),
+    ('GET', r'/versions', show_versions),
+]
+ROUTES = [(method, re.compile(pattern + r'/?$'), handler) for method, pattern, handler in ROUTES]
+
+class ArcadeRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive so terminals reuse their connection
+    server_version = 'ArcadeAPI/1.0'
+    disable_nagle_algorithm = True  # Headers and body go out as separate writes
+    timeout = 30  # Seconds a keep-alive connection may sit idle before it is closed
+    quiet = False
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PUT(self):
+        self.dispatch('PUT')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def dispatch(self, method):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            body = self.read_body()
+            handler, args, path_matched = None, (), False
+            for route_method, pattern, route_handler in ROUTES:
+                match = pattern.match(url.path)
+                if match:
+                    path_matched = True
+                    if route_method == method:
+                        handler, args = route_handler, [unquote(arg) for arg in match.groups()]
+                        break
+            if handler is None:
+                raise ApiError(405 if path_matched else 404, f"No route for {method} {url.path}")
+            status, payload = handler(query, body, *args)
+        except ApiError as e:
+            status, payload = e.status, {'error': e.message}
+        except (sqlite3.OperationalError, queue.Empty) as e:
+            status, payload = 503, {'error': f"Database busy: {str(e) or 'no free connection'}"}
+        except Exception:
+            # Always answer, a dropped connection looks like a network fault to the terminal
+            self.log_error("Error handling %s %s:\n%s", method, url.path, traceback.format_exc())
+            status, payload = 500, {'error': "Internal server error"}
+        self.send_json(status, payload)
+
+    def read_body(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            self.close_connection = True  # The body's end is unknown, so the connection can't be reused
+            raise ApiError(400, "Content-Length must be a number")
+        if length <= 0:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ApiError(400, "Request body must be JSON")
+        if not isinstance(body, dict):
+            raise ApiError(400, "Request body must be a JSON object")
+        return body
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+# Set up the database and build a server without starting it
+def make_server(host='127.0.0.1', port=8080, db_path=arcade_db.DB_PATH, pool_size=8, idle_timeout=30, quiet=False):
+    arcade_db.configure_pool(db_path, pool_size)
+    arcade_db.initialize_db()
+    for region in arcade_db.DEFAULT_REGIONS:
+        arcade_db.add_region_to_db(region)
+    handler = type('Handler', (ArcadeRequestHandler,), {'quiet': quiet, 'timeout': idle_timeout})
+    return ArcadeHTTPServer((host, port), handler)
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON API for the arcade management database")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--db', default=arcade_db.DB_PATH, help="SQLite database file")
+    parser.add_argument('--pool-size', type=int, default=8, help="Pooled database connections")
+    parser.add_argument('--idle-timeout', type=float, default=30, help="Seconds before an idle connection is closed")
+    parser.add_argument('--quiet', action='store_true', help="Don't log each request")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.db, args.pool_size, args.idle_timeout, args.quiet)
+    print(f"Arcade API listening on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
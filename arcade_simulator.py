@@ -0,0 +1,328 @@
+import argparse
+import hashlib
+import os
+import queue
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import arcade_db
+from play_analytics import PlayAnalytics
+
+# Relative weights of each operation in the default workload
+DEFAULT_MIX = {
+    'play': 70,
+    'score_update': 15,
+    'tournament_entry': 5,
+    'machine_edit': 5,
+    'arcade_edit': 5,
+}
+
+GAME_TITLES = [
+    "Pac-Man", "Galaga", "Street Fighter II", "Donkey Kong", "Mortal Kombat", "Tekken 3",
+    "Dance Dance Revolution", "Time Crisis", "Metal Slug", "Space Invaders", "Daytona USA",
+    "House of the Dead", "Ms. Pac-Man", "Centipede", "NBA Jam", "Marvel vs. Capcom",
+]
+
+# Simulated timestamps start here so plays and entries are the same on every run
+SIM_EPOCH = 1700000000.0
+
+# The arcades, machines and players a simulation runs against
+class Fleet:
+    def __init__(self, arcades, machines, players, titles):
+        self.arcades = arcades  # list of arcade_id
+        self.machines = machines  # list of (machine_id, arcade_id)
+        self.players = players  # list of username
+        self.titles = titles  # machine_id -> game title
+
+# Function to create a deterministic fleet in the database
+def build_fleet(seed, arcades, machines_per_arcade, players):
+    rng = random.Random(f'{seed}-fleet')
+    arcade_ids = [f'SIM-{a}' for a in range(arcades)]
+    machines = [(f'SIM-{a}-M{m}', arcade_id) for a, arcade_id in enumerate(arcade_ids)
+                for m in range(machines_per_arcade)]
+    usernames = [f'sim_player{p}' for p in range(players)]
+    titles = {machine_id: rng.choice(GAME_TITLES) for machine_id, _ in machines}
+
+    for region in arcade_db.DEFAULT_REGIONS:
+        arcade_db.add_region_to_db(region)
+    with arcade_db.pool.connection(write=True) as conn:
+        # Replace the fleet of an earlier run against the same --db, so repeat runs start alike
+        conn.execute("DELETE FROM machines WHERE machine_id LIKE 'SIM-%' AND arcade_id LIKE 'SIM-%'")
+        conn.execute("DELETE FROM arcades WHERE arcade_id LIKE 'SIM-%'")
+        region_ids = [row[0] for row in conn.execute('SELECT id FROM regions')]
+        conn.executemany('INSERT INTO arcades (arcade_id, location, region_id) VALUES (?, ?, ?)',
+                         ((arcade_id, f'Location {a}', region_ids[a % len(region_ids)])
+                          for a, arcade_id in enumerate(arcade_ids)))
+        conn.executemany('INSERT INTO machines (machine_id, machine_type, token_cost, arcade_id) VALUES (?, ?, ?, ?)',
+                         ((machine_id, titles[machine_id], rng.choice([0.25, 0.5, 0.75, 1.0, 1.5, 2.0]), arcade_id)
+                          for machine_id, arcade_id in machines))
+        conn.executemany('INSERT OR REPLACE INTO leaderboard (username, score) VALUES (?, ?)',
+                         ((username, rng.randint(1, 50000)) for username in usernames))
+    return Fleet(arcade_ids, machines, usernames, titles)
+
+# Zipf-like cumulative weights: a few machines and regulars account for most of the traffic
+def popularity_weights(rng, count, skew=1.1):
+    weights = [1.0 / (rank ** skew) for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    cumulative, total = [], 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    return cumulative
+
+# Produces the same sequence of operations for the same seed, fleet, mix and rate
+class WorkloadGenerator:
+    def __init__(self, seed, fleet, mix=None, rate=100.0, analytics=None):
+        self.rng = random.Random(seed)
+        self.fleet = fleet
+        self.mix = dict(mix or DEFAULT_MIX)
+        self.kinds = list(self.mix)
+        self.kind_weights = [self.mix[kind] for kind in self.kinds]
+        self.machine_weights = popularity_weights(self.rng, len(fleet.machines))
+        self.player_weights = popularity_weights(self.rng, len(fleet.players))
+        self.scores = {}  # Scores this workload has set, so updates are absolute values
+        self.interval = 1.0 / rate if rate else 0.001  # Simulated time between operations
+        self.analytics = analytics  # Optional PlayAnalytics fed with every generated play
+        self.count = 0
+        self.sim_time = SIM_EPOCH
+        self.digest = hashlib.sha256()
+
+    def _player(self):
+        return self.rng.choices(self.fleet.players, cum_weights=self.player_weights)[0]
+
+    def _machine(self):
+        return self.rng.choices(self.fleet.machines, cum_weights=self.machine_weights)[0]
+
+    # Next operation as a tuple: (kind, *arguments)
+    def next_operation(self):
+        kind = self.rng.choices(self.kinds, self.kind_weights)[0]
+        sim_time = self.sim_time = SIM_EPOCH + self.count * self.interval
+        if kind == 'play':
+            machine_id, _ = self._machine()
+            operation = ('play', self._player(), machine_id, self.rng.choice([1, 1, 1, 2, 3]), sim_time)
+            if self.analytics is not None:
+                self.analytics.record(operation[1], machine_id, self.fleet.titles[machine_id], sim_time)
+        elif kind == 'score_update':
+            username = self._player()
+            score = max(0, self.scores.get(username, 25000) + self.rng.randint(-1000, 1000))
+            self.scores[username] = score
+            operation = ('score_update', username, score)
+        elif kind == 'tournament_entry':
+            # A new tournament opens every 1000 operations
+            operation = ('tournament_entry', f'Tournament {self.count // 1000}', self._player(),
+                         self.rng.randint(0, 100000), sim_time)
+        elif kind == 'machine_edit':
+            machine_id, _ = self._machine()
+            operation = ('machine_edit', machine_id, self.rng.choice(GAME_TITLES),
+                         self.rng.choice([0.25, 0.5, 0.75, 1.0, 1.5, 2.0]))
+            self.fleet.titles[machine_id] = operation[2]
+        elif kind == 'arcade_edit':
+            arcade_index = self.rng.randrange(len(self.fleet.arcades))
+            operation = ('arcade_edit', self.fleet.arcades[arcade_index],
+                         f'Location {arcade_index} Unit {self.rng.randint(1, 99)}')
+        else:
+            raise ValueError(f"Unknown operation '{kind}'")
+        self.count += 1
+        self.digest.update(repr(operation).encode('utf-8'))
+        return operation
+
+# Function to run one generated operation against the data layer
+def apply_operation(operation):
+    kind, args = operation[0], operation[1:]
+    if kind == 'play':
+        arcade_db.record_play(*args)
+    elif kind == 'score_update':
+        username, score = args
+        arcade_db.save_scores_to_db({username: score})
+    elif kind == 'tournament_entry':
+        arcade_db.add_tournament_entry(*args)
+    elif kind == 'machine_edit':
+        arcade_db.update_machine(*args)
+    elif kind == 'arcade_edit':
+        arcade_db.update_arcade_location(*args)
+
+# Function to read this process's resident memory in bytes, or None where unavailable
+def resident_memory():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return None
+
+# Drives a workload at a fixed rate through worker threads and samples throughput, lock waits and memory
+class Simulation:
+    def __init__(self, generator, rate=100.0, workers=4):
+        self.generator = generator
+        self.rate = rate
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=workers * 64)
+        self.completed = 0
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def _worker(self):
+        while True:
+            operation = self.queue.get()
+            if operation is None:
+                return
+            try:
+                apply_operation(operation)
+                with self.lock:
+                    self.completed += 1
+            except sqlite3.Error as e:
+                with self.lock:
+                    key = f'{operation[0]}: {type(e).__name__}'
+                    self.errors[key] = self.errors.get(key, 0) + 1
+
+    def _sample(self, start, previous, report):
+        now = time.perf_counter()
+        stats = arcade_db.pool.stats()
+        with self.lock:
+            completed, errors = self.completed, sum(self.errors.values())
+        sample = {
+            'elapsed': now - start,
+            'completed': completed,
+            'errors': errors,
+            'rate': (completed - previous['completed']) / max(now - previous['time'], 1e-9),
+            'lock_wait_ms': (stats['lock_wait_seconds'] - previous['lock_wait_seconds']) * 1000,
+            'max_lock_wait_ms': stats['max_lock_wait_seconds'] * 1000,
+            'pool_wait_ms': (stats['pool_wait_seconds'] - previous['pool_wait_seconds']) * 1000,
+            'busy_errors': stats['busy_errors'],
+            'rss': resident_memory(),
+            'time': now,
+            'lock_wait_seconds': stats['lock_wait_seconds'],
+            'pool_wait_seconds': stats['pool_wait_seconds'],
+        }
+        if report:
+            report(sample)
+        return sample
+
+    # Run until duration seconds pass or max_operations are issued, whichever comes first
+    def run(self, duration=None, max_operations=None, report_every=10.0, report=None):
+        threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        start = time.perf_counter()
+        first = previous = self._sample(start, {'completed': 0, 'time': start, 'lock_wait_seconds': 0.0,
+                                                'pool_wait_seconds': 0.0}, None)
+        next_report = start + report_every
+        issued, max_lag = 0, 0.0
+        while (duration is None or time.perf_counter() - start < duration) and \
+                (max_operations is None or issued < max_operations):
+            if self.rate:
+                # Open loop: hold the schedule even when the database falls behind
+                due = start + issued / self.rate
+                lag = time.perf_counter() - due
+                if lag < 0:
+                    time.sleep(-lag)
+                max_lag = max(max_lag, lag)
+            self.queue.put(self.generator.next_operation())
+            issued += 1
+            if time.perf_counter() >= next_report:
+                previous = self._sample(start, previous, report)
+                next_report += report_every
+
+        for _ in threads:
+            self.queue.put(None)
+        for thread in threads:
+            thread.join()
+
+        last = self._sample(start, previous, report)
+        return {
+            'issued': issued,
+            'completed': last['completed'],
+            'errors': dict(self.errors),
+            'elapsed': last['elapsed'],
+            'throughput': last['completed'] / max(last['elapsed'], 1e-9),
+            'max_schedule_lag_ms': max_lag * 1000,
+            'pool_stats': arcade_db.pool.stats(),
+            'rss_start': first['rss'],
+            'rss_end': last['rss'],
+            'workload_digest': self.generator.digest.hexdigest(),
+        }
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        if kind.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown operation '{kind.strip()}'")
+        mix[kind.strip()] = float(weight)
+    return mix
+
+def format_megabytes(value):
+    return f"{value / (1024 * 1024):.1f} MB" if value is not None else "n/a"
+
+def print_sample(sample):
+    print(f"[{sample['elapsed']:8.0f}s] ops={sample['completed']:<10} rate={sample['rate']:8.1f}/s "
+          f"lock_wait={sample['lock_wait_ms']:8.1f} ms (max {sample['max_lock_wait_ms']:.1f} ms) "
+          f"pool_wait={sample['pool_wait_ms']:7.1f} ms busy={sample['busy_errors']} "
+          f"errors={sample['errors']} rss={format_megabytes(sample['rss'])}", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Seeded, repeatable arcade traffic simulator for soak tests")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--rate', type=float, default=200.0, help="Operations per second, 0 for as fast as possible")
+    parser.add_argument('--duration', type=float, help="Seconds to run (soak tests: hours)")
+    parser.add_argument('--operations', type=int, help="Stop after this many operations; same seed gives the same workload")
+    parser.add_argument('--workers', type=int, default=4, help="Writer threads; use 1 for a byte-identical database")
+    parser.add_argument('--arcades', type=int, default=50)
+    parser.add_argument('--machines-per-arcade', type=int, default=20)
+    parser.add_argument('--players', type=int, default=2000)
+    parser.add_argument('--mix', type=parse_mix, help="Operation weights, e.g. play=70,score_update=15,machine_edit=5")
+    parser.add_argument('--db', help="Database to run against (default: a scratch database that is removed afterwards)")
+    parser.add_argument('--report-every', type=float, default=10.0, help="Seconds between progress lines")
+    args = parser.parse_args()
+    if args.duration is None and args.operations is None:
+        args.duration = 60.0
+
+    scratch_dir = None
+    db_path = args.db
+    if db_path is None:
+        scratch_dir = tempfile.mkdtemp(prefix='arcade-sim-')
+        db_path = os.path.join(scratch_dir, 'arcade_simulation.db')
+
+    try:
+        arcade_db.configure_pool(db_path, size=args.workers + 1)
+        arcade_db.initialize_db()
+        fleet = build_fleet(args.seed, args.arcades, args.machines_per_arcade, args.players)
+        analytics = PlayAnalytics()
+        generator = WorkloadGenerator(args.seed, fleet, args.mix, args.rate, analytics)
+        simulation = Simulation(generator, args.rate, args.workers)
+        result = simulation.run(args.duration, args.operations, args.report_every, print_sample)
+    finally:
+        arcade_db.pool.close()
+        if scratch_dir is not None:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    stats = result['pool_stats']
+    print()
+    print(f"operations:       {result['completed']} of {result['issued']} issued in {result['elapsed']:.1f} s")
+    print(f"throughput:       {result['throughput']:.1f} ops/s (target {args.rate or 'unbounded'})")
+    print(f"schedule lag:     {result['max_schedule_lag_ms']:.1f} ms max")
+    print(f"write lock waits: {stats['lock_wait_seconds'] * 1000:.1f} ms total over {stats['write_transactions']} "
+          f"transactions, {stats['max_lock_wait_seconds'] * 1000:.1f} ms max, {stats['busy_errors']} busy errors")
+    print(f"pool waits:       {stats['pool_wait_seconds'] * 1000:.1f} ms total")
+    if result['rss_start'] is not None and result['rss_end'] is not None:
+        print(f"memory:           {format_megabytes(result['rss_start'])} -> {format_megabytes(result['rss_end'])} "
+              f"({format_megabytes(result['rss_end'] - result['rss_start'])} growth)")
+    if result['errors']:
+        print(f"errors:           {result['errors']}")
+    print(f"most played:      {', '.join(f'{title} ({count})' for title, count in analytics.most_played_games(5))}")
+    print("busiest machines: " + ', '.join(f"{machine_id} {title} {plays} plays ({utilization:.0%})"
+                                          for machine_id, title, plays, utilization
+                                          in analytics.busiest_machines(5, generator.sim_time)))
+    print(f"workload digest:  {result['workload_digest']}")
+
+if __name__ == '__main__':
+    main()
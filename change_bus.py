@@ -0,0 +1,76 @@
+import logging
+import sqlite3
+import threading
+
+import arcade_db
+
+logger = logging.getLogger(__name__)
+
+# In-process publish/subscribe bus keyed by table name
+class ChangeBus:
+    def __init__(self):
+        self._subscribers = []  # (set of tables, callback)
+        self._lock = threading.Lock()
+
+    # Call callback(changed_tables) whenever any of the given tables change
+    def subscribe(self, tables, callback):
+        with self._lock:
+            self._subscribers.append((set(tables), callback))
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers = [(tables, cb) for tables, cb in self._subscribers if cb is not callback]
+
+    # Notify each interested subscriber once, with only the tables it cares about
+    # A failing subscriber is logged and skipped so the others still see the change
+    def publish(self, changed_tables):
+        changed_tables = set(changed_tables)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for tables, callback in subscribers:
+            relevant = tables & changed_tables
+            if relevant:
+                try:
+                    callback(relevant)
+                except Exception:
+                    logger.exception("Subscriber to %s failed", ', '.join(sorted(relevant)))
+
+# Watches the database for commits from any connection or process and publishes changed tables
+class ChangeWatcher:
+    def __init__(self, bus, db_path=None):
+        self.bus = bus
+        self.db_path = db_path
+        self._conn = None
+        self._data_version = None
+        self._versions = {}
+
+    def _read_versions(self):
+        return dict(self._conn.execute('SELECT table_name, version FROM table_versions'))
+
+    # Check for changes; cheap when nothing was committed since the last call
+    def poll(self):
+        if self._conn is None:
+            # Dedicated connection: data_version only moves for commits made by other connections
+            self._conn = sqlite3.connect(self.db_path or arcade_db.pool.db_path, check_same_thread=False)
+            self._data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+            self._versions = self._read_versions()
+            return set()
+
+        data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version == self._data_version:
+            return set()
+        self._data_version = data_version
+
+        # Read after data_version, so a commit in between is picked up on the next poll
+        versions = self._read_versions()
+        changed = {table for table, version in versions.items() if self._versions.get(table) != version}
+        self._versions = versions
+        if changed:
+            self.bus.publish(changed)
+        return changed
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
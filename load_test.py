@@ -0,0 +1,146 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+import arcade_db
+import arcade_server
+
+# Weighted mix of requests a front desk / cabinet fleet sends, mostly reads
+REQUEST_MIX = [
+    ('leaderboard_read', 40),
+    ('arcade_list', 15),
+    ('machine_list', 15),
+    ('revenue', 10),
+    ('score_write', 15),
+    ('machine_write', 5),
+]
+
+# Pick the next request for a worker, returns (method, path, body)
+def next_request(rng, kind, worker_id, counter):
+    if kind == 'leaderboard_read':
+        return 'GET', '/leaderboard?limit=50', None
+    if kind == 'arcade_list':
+        return 'GET', '/arcades?region=' + rng.choice(arcade_db.DEFAULT_REGIONS).replace(' ', '%20'), None
+    if kind == 'machine_list':
+        return 'GET', f'/machines?arcade_id=LT-{rng.randint(0, 19)}', None
+    if kind == 'revenue':
+        return 'GET', '/revenue?region=' + rng.choice(arcade_db.DEFAULT_REGIONS).replace(' ', '%20'), None
+    if kind == 'score_write':
+        return 'PUT', f'/leaderboard/player{rng.randint(0, 499)}', {'score': rng.randint(0, 50000)}
+    machine_id = f'LT-M{worker_id}-{counter}'
+    return 'POST', '/machines', {'machine_id': machine_id, 'machine_type': 'Load Test',
+                                 'token_cost': 1.0, 'arcade_id': f'LT-{rng.randint(0, 19)}'}
+
+# Arcades the machine reads and writes point at
+def seed_load_test_data(host, port):
+    conn = http.client.HTTPConnection(host, port)
+    for i in range(20):
+        body = json.dumps({'arcade_id': f'LT-{i}', 'location': 'Load Test',
+                           'region': arcade_db.DEFAULT_REGIONS[i % len(arcade_db.DEFAULT_REGIONS)]})
+        conn.request('POST', '/arcades', body, {'Content-Type': 'application/json'})
+        conn.getresponse().read()
+    conn.close()
+
+def run_worker(host, port, worker_id, deadline, seed, latencies, errors):
+    rng = random.Random(seed + worker_id)
+    kinds = [kind for kind, _ in REQUEST_MIX]
+    weights = [weight for _, weight in REQUEST_MIX]
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    counter = 0
+    while time.perf_counter() < deadline:
+        counter += 1
+        method, path, body = next_request(rng, rng.choices(kinds, weights)[0], worker_id, counter)
+        data = json.dumps(body) if body is not None else None
+        headers = {'Content-Type': 'application/json'} if data else {}
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, data, headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run_load_test(host, port, clients, duration, seed):
+    seed_load_test_data(host, port)
+    latencies, errors = [], []  # list.append is atomic, workers share these
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=run_worker, args=(host, port, i, deadline, seed, latencies, errors))
+               for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_sec': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': (latencies[-1] * 1000) if latencies else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the arcade API and report requests/sec and p99 latency")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0,
+                        help="Port of a running server; 0 starts a local instance on a scratch copy of the database")
+    parser.add_argument('--db', default=arcade_db.DB_PATH, help="Database copied for the local instance")
+    parser.add_argument('--clients', type=int, default=8, help="Concurrent client connections")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds to run")
+    parser.add_argument('--pool-size', type=int, default=8, help="Database connections for the local instance")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    server = scratch_dir = None
+    host, port = args.host, args.port
+    if not port:
+        # Never load test the real database
+        scratch_dir = tempfile.mkdtemp(prefix='arcade-load-')
+        scratch_db = os.path.join(scratch_dir, 'arcade_management.db')
+        if os.path.exists(args.db):
+            shutil.copy(args.db, scratch_db)
+        server = arcade_server.make_server(host, 0, scratch_db, pool_size=args.pool_size, quiet=True)
+        port = server.server_port
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        result = run_load_test(host, port, args.clients, args.duration, args.seed)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            arcade_db.pool.close()
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    print(f"clients:      {args.clients}")
+    print(f"requests:     {result['requests']} ({result['errors']} errors)")
+    print(f"requests/sec: {result['requests_per_sec']:.1f}")
+    print(f"p50 latency:  {result['p50_ms']:.2f} ms")
+    print(f"p99 latency:  {result['p99_ms']:.2f} ms")
+    print(f"max latency:  {result['max_ms']:.2f} ms")
+
+if __name__ == '__main__':
+    main()
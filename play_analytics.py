@@ -0,0 +1,216 @@
+import hashlib
+import heapq
+import threading
+from collections import deque
+
+import arcade_db
+
+# Count-Min sketch: approximate counts for any key in fixed memory, never undercounts
+class CountMinSketch:
+    def __init__(self, width=2048, depth=4, seed=0):
+        self.width = width
+        self.depth = depth
+        self.salt = str(seed).encode('utf-8')[:16]
+        self.rows = [[0] * width for _ in range(depth)]
+        self.total = 0
+
+    def _columns(self, key):
+        # Two 64-bit halves of one hash give every row its own column (double hashing)
+        digest = hashlib.blake2b(str(key).encode('utf-8'), digest_size=16, salt=self.salt).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, key, count=1):
+        for row, column in zip(self.rows, self._columns(key)):
+            row[column] += count
+        self.total += count
+
+    def estimate(self, key):
+        return min(row[column] for row, column in zip(self.rows, self._columns(key)))
+
+# Space-Saving: keeps the top `capacity` keys; each count overestimates by at most its error
+class SpaceSaving:
+    def __init__(self, capacity=50):
+        self.capacity = capacity
+        self.counts = {}  # key -> count
+        self.errors = {}  # key -> overestimate inherited from the evicted key
+        self._heap = []  # (count, key), may hold stale entries
+
+    def add(self, key, count=1):
+        if key in self.counts:
+            self.counts[key] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = count
+            self.errors[key] = 0
+        else:
+            # Replace the smallest counter; the newcomer inherits its count as error
+            smallest_count, smallest_key = self._pop_smallest()
+            del self.counts[smallest_key]
+            del self.errors[smallest_key]
+            self.counts[key] = smallest_count + count
+            self.errors[key] = smallest_count
+        heapq.heappush(self._heap, (self.counts[key], key))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(value, k) for k, value in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_smallest(self):
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == count:
+                return count, key
+
+    # Most frequent keys as (key, count), highest first
+    def top(self, n=None):
+        items = sorted(self.counts.items(), key=lambda item: (-item[1], str(item[0])))
+        return items if n is None else items[:n]
+
+    def error(self, key):
+        return self.errors.get(key, 0)
+
+# Heavy hitters over an unbounded stream: Space-Saving picks the leaders, Count-Min bounds their counts
+class HeavyHitters:
+    def __init__(self, capacity=50, width=2048, depth=4, seed=0):
+        self.candidates = SpaceSaving(capacity)
+        self.sketch = CountMinSketch(width, depth, seed)
+
+    def add(self, key, count=1):
+        self.candidates.add(key, count)
+        self.sketch.add(key, count)
+
+    def estimate(self, key):
+        return self.sketch.estimate(key)
+
+    def top(self, n=10):
+        # Both structures only overestimate, so the smaller figure is the tighter one
+        ranked = [(key, min(count, self.sketch.estimate(key))) for key, count in self.candidates.top()]
+        ranked.sort(key=lambda item: (-item[1], str(item[0])))
+        return ranked[:n]
+
+# Play count over the last window_seconds, kept in a fixed number of time buckets
+class SlidingWindowCounter:
+    def __init__(self, window_seconds=3600, buckets=60):
+        self.bucket_seconds = window_seconds / buckets
+        self.buckets = buckets
+        self._counts = deque()  # [bucket_index, count], oldest first
+
+    def _expire(self, newest_index):
+        while self._counts and self._counts[0][0] <= newest_index - self.buckets:
+            self._counts.popleft()
+
+    def add(self, timestamp, count=1):
+        index = int(timestamp // self.bucket_seconds)
+        if not self._counts or index > self._counts[-1][0]:
+            self._counts.append([index, count])
+            self._expire(index)
+            return
+        if index <= self._counts[-1][0] - self.buckets:
+            return  # Older than the window
+        # Late play: find or insert its bucket, scanning from the newest
+        for position in range(len(self._counts) - 1, -1, -1):
+            bucket = self._counts[position]
+            if bucket[0] == index:
+                bucket[1] += count
+                return
+            if bucket[0] < index:
+                self._counts.insert(position + 1, [index, count])
+                return
+        self._counts.appendleft([index, count])
+
+    def total(self, now):
+        self._expire(int(now // self.bucket_seconds))
+        return sum(count for _, count in self._counts)
+
+# Most-played games and busiest machines from the stream of plays, in bounded memory
+class PlayAnalytics:
+    def __init__(self, top_k=50, window_seconds=3600, buckets=60, play_seconds=90):
+        self.games = HeavyHitters(top_k)
+        self.player_games = {}  # username -> {game title: plays}, exact since there are only so many titles
+        self.machine_windows = {}  # machine_id -> SlidingWindowCounter
+        self.machine_titles = {}  # machine_id -> game title of its latest play
+        self.window_seconds = window_seconds
+        self.buckets = buckets
+        self.play_seconds = play_seconds  # Average length of one credit, for utilization
+        self.plays = 0
+        self.latest_play = 0.0
+        self.last_play_id = 0
+        self.lock = threading.Lock()
+
+    def record(self, username, machine_id, game_title, played_at, count=1):
+        with self.lock:
+            self.games.add(game_title, count)
+            games = self.player_games.setdefault(username, {})
+            games[game_title] = games.get(game_title, 0) + count
+            if machine_id not in self.machine_windows:
+                self.machine_windows[machine_id] = SlidingWindowCounter(self.window_seconds, self.buckets)
+            self.machine_windows[machine_id].add(played_at, count)
+            self.machine_titles[machine_id] = game_title
+            self.plays += count
+            self.latest_play = max(self.latest_play, played_at)
+
+    # Seed the counters from per-machine and per-player totals instead of replaying every play
+    def load_totals_from_db(self):
+        bucket_seconds = self.window_seconds / self.buckets
+        last_id, latest_play, machine_totals, player_totals, recent = \
+            arcade_db.get_play_totals(self.window_seconds, bucket_seconds)
+        game_totals = {}
+        for machine_id, game_title, plays in machine_totals:
+            game_totals[game_title] = game_totals.get(game_title, 0) + plays
+        with self.lock:
+            for machine_id, game_title, plays in machine_totals:
+                self.machine_titles[machine_id] = game_title
+                self.plays += plays
+            for game_title, plays in game_totals.items():
+                self.games.add(game_title, plays)
+            for username, game_title, plays in player_totals:
+                games = self.player_games.setdefault(username, {})
+                games[game_title] = games.get(game_title, 0) + plays
+            for machine_id, bucket, plays in recent:
+                if machine_id not in self.machine_windows:
+                    self.machine_windows[machine_id] = SlidingWindowCounter(self.window_seconds, self.buckets)
+                self.machine_windows[machine_id].add((bucket + 0.5) * bucket_seconds, plays)  # Middle of the bucket
+            self.latest_play = max(self.latest_play, latest_play)
+            self.last_play_id = max(self.last_play_id, last_id)
+
+    # Read plays committed since the last sync, a batch at a time; the first sync reads totals instead
+    # Returns the players with new plays, or None when the totals were loaded and every player may have changed
+    def sync_from_db(self, batch_size=5000):
+        with self.lock:
+            last_id = self.last_play_id
+        usernames = set()
+        if not last_id:
+            self.load_totals_from_db()
+            usernames = None
+            with self.lock:
+                last_id = self.last_play_id
+        for play_id, username, machine_id, game_title, played_at in arcade_db.iter_plays(last_id, batch_size):
+            self.record(username, machine_id, game_title, played_at)
+            if usernames is not None:
+                usernames.add(username)
+            last_id = play_id
+        with self.lock:
+            self.last_play_id = max(self.last_play_id, last_id)
+        return usernames
+
+    def most_played_games(self, n=10):
+        with self.lock:
+            return self.games.top(n)
+
+    def most_played_game(self, username):
+        with self.lock:
+            games = self.player_games.get(username)
+            if not games:
+                return None
+            # Most plays wins, ties go to the first title alphabetically
+            return min(games.items(), key=lambda item: (-item[1], str(item[0])))[0]
+
+    # Machines with the most plays in the window ending at now, as (machine_id, title, plays, utilization)
+    def busiest_machines(self, n=10, now=None):
+        with self.lock:
+            now = self.latest_play if now is None else now
+            totals = ((machine_id, window.total(now)) for machine_id, window in self.machine_windows.items())
+            busiest = heapq.nlargest(n, totals, key=lambda item: item[1])
+            return [(machine_id, self.machine_titles.get(machine_id), plays,
+                     min(1.0, plays * self.play_seconds / self.window_seconds))
+                    for machine_id, plays in busiest if plays]
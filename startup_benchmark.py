@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import runpy
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ManagementMidterm.py')
+
+# Build a scratch database with the given number of arcades, machines per arcade and players
+def build_database(db_path, arcades, machines_per_arcade, players):
+    import arcade_db
+    arcade_db.configure_pool(db_path)
+    arcade_db.initialize_db()
+    for region in arcade_db.DEFAULT_REGIONS:
+        arcade_db.add_region_to_db(region)
+    with arcade_db.pool.connection() as conn:
+        region_ids = [row[0] for row in conn.execute('SELECT id FROM regions')]
+        conn.executemany('INSERT INTO arcades (arcade_id, location, region_id) VALUES (?, ?, ?)',
+                         ((f'ARC-{a}', f'Location {a}', region_ids[a % len(region_ids)]) for a in range(arcades)))
+        conn.executemany('INSERT INTO machines (machine_id, machine_type, token_cost, arcade_id) VALUES (?, ?, ?, ?)',
+                         ((f'M-{a}-{m}', f'Game {m % 40}', 0.25 + (m % 8) * 0.25, f'ARC-{a}')
+                          for a in range(arcades) for m in range(machines_per_arcade)))
+        conn.executemany('INSERT INTO leaderboard (username, score) VALUES (?, ?)',
+                         ((f'player{p}', (p * 7919) % 50000) for p in range(players)))
+    arcade_db.pool.close()
+
+# Runs in a fresh interpreter: time from launch to the first drawn window, then to each tab's first draw
+def run_child(db_path):
+    start = time.perf_counter()
+    import tkinter as tk
+    from tkinter import ttk
+    import arcade_db
+    arcade_db.configure_pool(db_path)
+    result = {}
+
+    def measure_and_exit(root):
+        root.update()
+        result['first_window_ms'] = (time.perf_counter() - start) * 1000
+
+        # Cost of opening each tab for the first time, now paid on selection instead of at launch
+        def time_tabs(parent):
+            for notebook in [child for child in parent.winfo_children() if isinstance(child, ttk.Notebook)]:
+                for tab in notebook.tabs():
+                    name = notebook.tab(tab, 'text')
+                    tab_start = time.perf_counter()
+                    notebook.select(tab)
+                    root.update()
+                    result[name] = (time.perf_counter() - tab_start) * 1000
+                    # Sub-tabs, like Regional and Local Management, are timed while their parent tab is shown
+                    time_tabs(root.nametowidget(tab))
+
+        time_tabs(root)
+        root.destroy()
+
+    tk.Tk.mainloop = measure_and_exit
+    runpy.run_path(APP_PATH, run_name='__main__')
+    print(json.dumps(result))
+
+def measure(db_path, repeat):
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', db_path],
+                                capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(db_path)).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time-to-first-window as the database grows")
+    parser.add_argument('--child', metavar='DB', help=argparse.SUPPRESS)
+    parser.add_argument('--players', type=int, nargs='+', default=[100, 1000, 10000, 50000],
+                        help="Leaderboard sizes to test; arcades and machines grow with them")
+    parser.add_argument('--repeat', type=int, default=3, help="Launches per size, the median is reported")
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    scratch_dir = tempfile.mkdtemp(prefix='arcade-startup-')
+    try:
+        rows = []
+        for players in args.players:
+            arcades = max(1, players // 50)
+            db_path = os.path.join(scratch_dir, f'startup_{players}.db')
+            build_database(db_path, arcades, 10, players)
+            rows.append((players, arcades, arcades * 10, measure(db_path, args.repeat)))
+
+        tab_names = [key for key in rows[0][3] if key != 'first_window_ms']
+        widths = [max(12, len(name)) for name in tab_names]
+        print(f"{'players':>8} {'arcades':>8} {'machines':>9} {'first window':>13}  "
+              + "  ".join(f"{name:>{width}}" for name, width in zip(tab_names, widths)))
+        for players, arcades, machines, timings in rows:
+            print(f"{players:>8} {arcades:>8} {machines:>9} {timings['first_window_ms']:>10.1f} ms  "
+                  + "  ".join(f"{timings[name]:>{width - 3}.1f} ms" for name, width in zip(tab_names, widths)))
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()